@@ -2,10 +2,13 @@ import logging
 from datetime import datetime, timedelta
 import pandas as pd
 from tefas import Crawler
-from typing import Dict
+from typing import Dict, Optional
 
-from pyfolio_core.core.database import LocalDatabase
+from pyfolio_core.core.database import MarketDatabase, PortfolioDatabase
 from pyfolio_core.core.constants import SCALING_FACTOR
+from pyfolio_core.core.enums import Currency
+from pyfolio_core.core.validation import PriceValidator
+from pyfolio_core.core.alerts import AlertEngine
 
 logger = logging.getLogger("FundService")
 logger.setLevel(logging.INFO)
@@ -25,12 +28,22 @@ if not logger.handlers:
 
 class FundDataService:
 
-    def __init__(self, db_path: str):
-        self.db_manager = LocalDatabase(db_path)
+    def __init__(self, market_db_path: str, pfolio_db_path: str):
+        self.market_db = MarketDatabase(market_db_path)
+        self.pfolio_db = PortfolioDatabase(pfolio_db_path)
+        self.validator = PriceValidator(self.market_db)
+        self.alert_engine = AlertEngine(self.pfolio_db, self.market_db)
         self.crawler = Crawler()
 
     def _get_latest_fund_data(self) -> Dict[str, float]:
 
+        df = self._get_latest_fund_frame()
+        if df is None:
+            return {}
+        return pd.Series(df.price.values, index=df.code).to_dict()
+
+    def _get_latest_fund_frame(self) -> Optional[pd.DataFrame]:
+
         today = datetime.now().date()
 
         logger.info(f"Fetching TEFAS data ({today})...")
@@ -39,7 +52,7 @@ class FundDataService:
             df = self.crawler.fetch(start=today)
         except Exception as e:
             logger.error(f"TEFAS fetch error: {e}")
-            return {}
+            return None
             
         if df is None or df.empty:
             yesterday = today - timedelta(days=1)
@@ -58,16 +71,15 @@ class FundDataService:
                 pass
 
         if df is not None and not df.empty:
-            price_dict = pd.Series(df.price.values, index=df.code).to_dict()
-            logger.info(f"TEFAS data retrieved. Total Funds: {len(price_dict)}")
-            return price_dict
+            logger.info(f"TEFAS data retrieved. Total Funds: {df.code.nunique()}")
+            return df
         else:
             logger.error("Cannot retrieve data from TEFAS (All attempts failed).")
-            return {}
+            return None
 
     def update_portfolio_prices(self):
 
-        conn = self.db_manager.get_connection()
+        conn = self.pfolio_db._get_connection()
         
         try:
             result = conn.execute("SELECT symbol FROM portfolio_assets WHERE asset_type = 'FUND'").fetchall()
@@ -97,10 +109,11 @@ class FundDataService:
                 try:
                     conn.execute("""
                         UPDATE portfolio_assets 
-                        SET current_price_integer = ?, 
+                        SET current_price = ?, 
+                            currency = ?,
                             last_updated = current_timestamp
                         WHERE symbol = ?
-                    """, (price_integer, symbol))
+                    """, (price_integer, Currency.TRY.value, symbol))
                     
                     update_count += 1
                     logger.info(f"{symbol}: {price_float:.4f} TL -> updated.")
@@ -110,46 +123,46 @@ class FundDataService:
             else:
                 logger.warning(f"Fund {symbol} not found in TEFAS data.")
 
+        conn.commit()
+
         logger.info(f"Fund update complete. Success: {update_count}/{len(db_symbols)}")
 
+        if update_count:
+            try:
+                self.alert_engine.run(symbols=sorted(db_symbols))
+            except Exception as e:
+                logger.error(f"Alert evaluation failed: {e}")
+
     def fetch_market_daily_close(self):
         """
         [CRON JOB] TEFAS'taki TÜM fonların verilerini 'daily_prices' tablosuna basar.
         """
         logger.info("Starting Daily TEFAS Sync...")
         
-        tefas_data = self._get_latest_fund_data()
-        if not tefas_data:
+        df = self._get_latest_fund_frame()
+        if df is None:
             return
 
-        conn = self.db_manager.get_connection()
-        today_str = datetime.now().date().strftime('%Y-%m-%d')
-        
-        success_count = 0
-        
-        for symbol, price in tefas_data.items():
-            try:
-                price_integer = int(round(price * SCALING_FACTOR))
-                
-                conn.execute("""
-                    INSERT INTO daily_prices (symbol, event_date, open_integer, high_integer, low_integer, close_integer, volume)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                    ON CONFLICT(symbol, event_date) DO UPDATE SET
-                        close_integer = EXCLUDED.close_integer
-                """, (
-                    symbol, today_str, 
-                    price_integer, price_integer, price_integer, price_integer, 
-                    0
-                ))
-                success_count += 1
-            except Exception as e:
-                logger.debug(f"Sync skip {symbol}: {e}")
+        # TEFAS carries one price per fund and day; the real publication date
+        # is kept so holiday re-publications are caught as stale bars.
+        prices = (df['price'] * SCALING_FACTOR).round().astype('Int64')
+        batch = pd.DataFrame({
+            'symbol': df['code'],
+            'event_date': pd.to_datetime(df['date']),
+            'open': prices,
+            'high': prices,
+            'low': prices,
+            'close': prices,
+            'volume': 0.0,
+        })
+
+        success_count = self.validator.ingest(batch, source="TEFAS")
                 
-        logger.info(f"Daily Sync Complete. Processed: {success_count} funds.")
+        logger.info(f"Daily Sync Complete. Processed: {success_count}/{len(batch)} funds.")
 
 # --- TEST ---
 if __name__ == "__main__":
-    service = FundDataService(db_path="data/portfolio.duckdb")
+    service = FundDataService(market_db_path="data/GlobalMarket.duckdb", pfolio_db_path="data/Portfolio.db")
     
     # 1. Portföy Güncelleme Testi
     # service.update_portfolio_prices()
@@ -0,0 +1,96 @@
+import time
+import logging
+import pandas as pd
+from tvDatafeed import TvDatafeed, Interval
+from typing import Iterable
+
+from pyfolio_core.core.database import MarketDatabase
+from pyfolio_core.core.enums import Exchange
+from pyfolio_core.core.constants import SCALING_FACTOR, DEFAULT_FX_PAIRS
+
+logger = logging.getLogger("FxRateService")
+logger.setLevel(logging.INFO)
+
+if not logger.handlers:
+    c_handler = logging.StreamHandler()
+    c_handler.setLevel(logging.INFO)
+    c_format = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt='%H:%M:%S')
+    c_handler.setFormatter(c_format)
+    logger.addHandler(c_handler)
+
+    f_handler = logging.FileHandler('error.log')
+    f_handler.setLevel(logging.ERROR)
+    f_format = logging.Formatter('%(asctime)s | %(name)s | %(levelname)s | %(message)s')
+    f_handler.setFormatter(f_format)
+    logger.addHandler(f_handler)
+
+class FxRateService:
+    """
+    Pulls daily FX closes from the FX_IDC feed (Exchange.FOREX) into 'fx_rates'.
+    """
+
+    def __init__(self, market_db_path: str, pairs: Iterable[str] = DEFAULT_FX_PAIRS):
+
+        self.market_db = MarketDatabase(market_db_path)
+        self.pairs = [str(p).upper() for p in pairs]
+        self.tv = None  # Lazy-loading
+
+    def _get_server_connection(self):
+
+        if self.tv is None:
+            logger.info("Connecting to TradingView servers...")
+            try:
+                self.tv = TvDatafeed()
+            except Exception as e:
+                logger.error(f"Connection Error: {e}")
+                raise ConnectionError("TradingView connection could not be established.")
+        return self.tv
+
+    def fetch_fx_rates(self, n_bars: int = 1) -> int:
+        """
+        [CRON JOB] Fetches the last 'n_bars' daily closes of every pair and upserts them.
+        Use a large n_bars once to backfill history for historical valuation.
+        """
+        logger.info(f"FX Sync Started ({len(self.pairs)} pairs, {n_bars} bars)...")
+        tv = self._get_server_connection()
+
+        frames = []
+        for pair in self.pairs:
+            if len(pair) != 6:
+                logger.warning(f"FX pair '{pair}' skipped: expected <BASE><QUOTE> (e.g. USDTRY).")
+                continue
+            try:
+                df = tv.get_hist(symbol=pair, exchange=Exchange.FOREX.value, interval=Interval.in_daily, n_bars=n_bars)
+                if df is None or df.empty:
+                    logger.warning(f"{pair} returned empty data.")
+                    continue
+
+                frames.append(pd.DataFrame({
+                    'base_currency': pair[:3],
+                    'quote_currency': pair[3:],
+                    'event_date': df.index.normalize().date,
+                    'rate': (df['close'] * SCALING_FACTOR).round().astype('int64').values,
+                }))
+                time.sleep(0.1)
+            except Exception as e:
+                logger.error(f"FX_SYNC_FAIL | Pair: {pair} | Reason: {e}")
+
+        if not frames:
+            logger.error("FX Sync: no rates retrieved.")
+            return 0
+
+        fx_batch = pd.concat(frames, ignore_index=True)
+        conn = self.market_db._get_connection()
+        conn.register('fx_batch', fx_batch)
+        try:
+            conn.execute("""
+                INSERT INTO fx_rates (base_currency, quote_currency, event_date, rate)
+                SELECT base_currency, quote_currency, event_date, rate FROM fx_batch
+                ON CONFLICT(base_currency, quote_currency, event_date) DO UPDATE SET
+                    rate = EXCLUDED.rate
+            """)
+        finally:
+            conn.unregister('fx_batch')
+
+        logger.info(f"FX Sync Complete. Rates written: {len(fx_batch)}")
+        return len(fx_batch)
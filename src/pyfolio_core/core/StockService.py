@@ -1,6 +1,7 @@
 import time
 import requests
 import logging
+import pandas as pd
 from tvDatafeed import TvDatafeed, Interval
 from typing import Optional, List, Union
 
@@ -9,6 +10,9 @@ from pyfolio_core.core.database import MarketDatabase, PortfolioDatabase
 from pyfolio_core.core.enums import Exchange
 from pyfolio_core.core.constants import SCALING_FACTOR
 from pyfolio_core.core.domainobjects import StockValue
+from pyfolio_core.core.pricecache import PriceCache
+from pyfolio_core.core.alerts import AlertEngine
+from pyfolio_core.core.validation import PriceValidator
 
 logger = logging.getLogger("TradingViewService")
 logger.setLevel(logging.INFO)
@@ -30,12 +34,19 @@ if not logger.handlers:
 
 class TradingViewService(StockService):
 
-    def __init__(self, market_db_path: str, pfolio_db_path: str, exchange: Union[Exchange, str] = Exchange.BIST):
+    def __init__(self, market_db_path: str, pfolio_db_path: str, exchange: Union[Exchange, str] = Exchange.BIST,
+                 price_cache_dir: Optional[str] = None):
         
         self.market_db = MarketDatabase(market_db_path)
         self.pfolio_db = PortfolioDatabase(pfolio_db_path)
+        # Optional memory-mapped close cache, refreshed after every market sync
+        self.price_cache = PriceCache(self.market_db, price_cache_dir) if price_cache_dir else None
+        self.alert_engine = AlertEngine(self.pfolio_db, self.market_db)
+        self.validator = PriceValidator(self.market_db)
         
         self.exchange = exchange.value if isinstance(exchange, Exchange) else str(exchange).upper()
+        # Quote currency of the prices fetched here; written to portfolio_assets.currency
+        self.currency = Exchange(self.exchange).currency if self.exchange in Exchange.list_all() else None
             
         self.tv = None  # Lazy-loading
         self._clean_map = str.maketrans('', '', '\u200b\t\n\r ')
@@ -92,13 +103,15 @@ class TradingViewService(StockService):
         price = int(round(price_float * SCALING_FACTOR))
 
         try:
-            conn = self.market_db.get_connection()
+            conn = self.pfolio_db._get_connection()
             conn.execute("""
                 UPDATE portfolio_assets 
                 SET current_price = ?,
+                    currency = COALESCE(?, currency),
                     last_updated = current_timestamp
                 WHERE symbol = ?
-            """, (price, clean_sym))
+            """, (price, self.currency.value if self.currency else None, clean_sym))
+            conn.commit()
             
             logger.info(f"{clean_sym}: {price_float:.2f} updated.")
             return True
@@ -111,7 +124,7 @@ class TradingViewService(StockService):
         logger.info("*** Mass Portfolio Update Begins ***")
         
         try:
-            conn = self.market_db.get_connection()
+            conn = self.pfolio_db._get_connection()
             result = conn.execute("SELECT symbol FROM portfolio_assets WHERE asset_type = 'STOCK'").fetchall()
             raw_symbols = [row[0] for row in result]
         except Exception as e:
@@ -131,6 +144,14 @@ class TradingViewService(StockService):
                 success_count += 1
         
         logger.info(f"Update complete. Success: {success_count}/{len(symbols)}")
+        self._run_alerts(symbols)
+
+    def _run_alerts(self, symbols: List[str]):
+
+        try:
+            self.alert_engine.run(symbols=symbols)
+        except Exception as e:
+            logger.error(f"Alert evaluation failed: {e}")
 
     def get_available_tickers(self) -> List[str]:
         
@@ -190,7 +211,7 @@ class TradingViewService(StockService):
             logger.error(f"Scanner Exception: {e}")
             return []
 
-    def fetch_market_daily_close(self) -> StockValue:
+    def fetch_market_daily_close(self) -> List[StockValue]:
         
         logger.info(f"{self.exchange} Daily Market Data Sync Started...")
         
@@ -199,53 +220,43 @@ class TradingViewService(StockService):
             logger.info(f"Ticker list read error.")
             return
 
-        conn = self.market_db.get_connection()
         tv = self._get_server_connection()
         
         print(f"Toplam {len(tickers)} hisse işlenecek.")
                 
-        success_count = 0
-        
-        stockvalues: list[StockService] = []
+        stockvalues: list[StockValue] = []
         for symbol in tickers:
             try:
                 df = tv.get_hist(symbol=symbol, exchange=self.exchange, interval=Interval.in_daily, n_bars=1)
                 
                 if df is not None and not df.empty:
-                    row = df.iloc[-1]
-                    stockvalue = StockValue.from_tv_dataframe(symbol, row)
-                    event_date = row.name.strftime('%Y-%m-%d')
-                    open = int(round(row['open'] * SCALING_FACTOR))
-                    high = int(round(row['high'] * SCALING_FACTOR))
-                    low = int(round(row['low'] * SCALING_FACTOR))
-                    close = int(round(row['close'] * SCALING_FACTOR))
-                    volume = float(row['volume'])
-                    
-                    stockvalues.append(stockvalue)
-
-                    # DuckDB Upsert (Insert or Replace)
-                    conn.execute("""
-                        INSERT INTO daily_prices (symbol, event_date, open, high, low, close, volume)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                        ON CONFLICT(symbol, event_date) DO UPDATE SET
-                            open = EXCLUDED.open,
-                            high = EXCLUDED.high,
-                            low = EXCLUDED.low,
-                            close = EXCLUDED.close,
-                            volume = EXCLUDED.volume
-                        """, (
-                        symbol, event_date, 
-                        open, high, low, close, 
-                        volume
-                    ))
-                    
-                    success_count += 1
+                    stockvalues.append(StockValue.from_tv_dataframe(symbol, df.iloc[-1]))
                     time.sleep(0.1)
                     
-                return stockvalues
-                    
             except Exception as e:
                 # A single stock mistake shouldn't break the entire cycle.
                 logger.error(f"SYNC_FAIL | Exchange: {self.exchange} | Symbol: {symbol} | Reason: {e}")
         
-        logger.info(f"Sync Complete. Processed: {success_count}/{len(tickers)}")
\ No newline at end of file
+        # Validation + bulk upsert; rejected bars end up in 'quarantine_prices'
+        batch = StockValue.to_frame(stockvalues)
+        success_count = self.validator.ingest(batch, source=self.exchange)
+        
+        logger.info(f"Sync Complete. Processed: {success_count}/{len(tickers)}")
+
+        if success_count:
+            try:
+                # The synced day of this exchange, not the latest day across all exchanges
+                self.market_db.refresh_screener(pd.Timestamp(batch['event_date'].max()).date(), self.exchange)
+            except Exception as e:
+                logger.error(f"Screener refresh failed ({self.exchange}): {e}")
+
+        if self.price_cache is not None and success_count:
+            try:
+                self.price_cache.sync(self.exchange, tickers)
+            except Exception as e:
+                logger.error(f"Price cache sync failed ({self.exchange}): {e}")
+
+        if success_count:
+            self._run_alerts(tickers)
+
+        return stockvalues
\ No newline at end of file
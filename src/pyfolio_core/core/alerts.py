@@ -0,0 +1,152 @@
+import logging
+from datetime import date
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from pyfolio_core.core.database import MarketDatabase, PortfolioDatabase
+from pyfolio_core.core.constants import SCALING_FACTOR, STRATEGY_MOVE_THRESHOLDS, MARKET_MOVE_THRESHOLD
+
+logger = logging.getLogger("PyFolio-Core")
+
+ALERT_COLUMNS = ['symbol', 'rule', 'event_date', 'price', 'change_pct', 'message']
+
+class AlertEngine:
+    """
+    Evaluates every alert rule in one vectorized pass after a price update:
+        * STOP_LOSS     -> price <= portfolio_assets.stop_loss
+        * TARGET        -> price >= portfolio_assets.target_price
+        * STRATEGY_MOVE -> |daily change| >= STRATEGY_MOVE_THRESHOLDS[strategy_mode]
+        * MARKET_MOVE   -> |daily change| >= MARKET_MOVE_THRESHOLD, any synced symbol
+    Freshness is decided per symbol (its own last bar), so exchanges that close
+    on different days are evaluated together. Triggered alerts are
+    deduplicated per (symbol, rule, event_date) in 'alerts'.
+    """
+
+    def __init__(self, pfolio_db: PortfolioDatabase, market_db: MarketDatabase):
+
+        self.pfolio_db = pfolio_db
+        self.market_db = market_db
+
+    def _latest_moves(self, as_of: Optional[date]) -> pd.DataFrame:
+        """
+        Each symbol's last bar and its daily change. Only the two weeks before
+        'as_of' (default: newest bar of any exchange) are scanned.
+        """
+        conn = self.market_db._get_connection()
+        # Resolve the upper bound first: literal bounds let DuckDB prune by zone maps
+        anchor = as_of or conn.execute("SELECT max(event_date) FROM daily_prices_compact").fetchone()[0]
+        if anchor is None:
+            return pd.DataFrame(columns=['symbol', 'event_date', 'close', 'prev_close', 'change_pct'])
+
+        return conn.execute("""
+            SELECT s.symbol, m.event_date, m.close, m.prev_close,
+                   ROUND(((m.close - m.prev_close) * 1.0 / NULLIF(m.prev_close, 0)) * 100, 2) AS change_pct
+            FROM (
+                SELECT symbol_id, event_date, close,
+                       LAG(close) OVER (PARTITION BY symbol_id ORDER BY event_date) AS prev_close,
+                       ROW_NUMBER() OVER (PARTITION BY symbol_id ORDER BY event_date DESC) AS rn
+                FROM daily_prices_compact
+                WHERE event_date BETWEEN CAST(? AS DATE) - INTERVAL 14 DAY AND CAST(? AS DATE)
+            ) m
+            JOIN symbols s USING (symbol_id)
+            WHERE m.rn = 1
+        """, (anchor, anchor)).df()
+
+    def _holdings(self) -> pd.DataFrame:
+
+        return pd.read_sql_query("""
+            SELECT symbol, strategy_mode, current_price, stop_loss, target_price, last_updated
+            FROM portfolio_assets
+            WHERE total_quantity > 0
+        """, self.pfolio_db._get_connection())
+
+    def evaluate(self, as_of: Optional[date] = None, symbols: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Returns the triggered alerts (not yet persisted).
+        'symbols' limits MARKET_MOVE to the symbols of a sync (default: every symbol
+        with a bar in the last two weeks); holdings are always evaluated.
+        """
+        moves = self._latest_moves(as_of)
+        fallback_date = (as_of or date.today()).isoformat()
+
+        frames = []
+
+        holdings = self._holdings()
+        if not holdings.empty:
+            h = holdings.merge(moves, on='symbol', how='left')
+            # The symbol's last bar is fresh unless current_price was written on a later day
+            # (e.g. update_portfolio_prices, funds). Stale or missing bars fall back to
+            # current_price and skip the move rule.
+            bar_day = pd.to_datetime(h['event_date']).dt.normalize()
+            updated_day = pd.to_datetime(h['last_updated'], errors='coerce').dt.normalize()
+            newer_price = (updated_day > bar_day) & (h['current_price'].fillna(0) > 0)
+            if as_of is not None:
+                newer_price &= updated_day <= pd.Timestamp(as_of)
+            fresh = (bar_day.notna() & ~newer_price).to_numpy()
+            h.loc[~fresh, ['event_date', 'close', 'change_pct']] = None
+            price = h['close'].fillna(h['current_price']).to_numpy(dtype=np.float64)
+            change = h['change_pct'].to_numpy(dtype=np.float64, na_value=np.nan)
+            stop_loss = h['stop_loss'].fillna(0).to_numpy(dtype=np.float64)
+            target = h['target_price'].fillna(0).to_numpy(dtype=np.float64)
+            move_limit = h['strategy_mode'].str.upper().map(STRATEGY_MOVE_THRESHOLDS).to_numpy(dtype=np.float64, na_value=np.nan)
+
+            h['event_date'] = pd.to_datetime(h['event_date']).dt.strftime('%Y-%m-%d').fillna(fallback_date)
+            h['price'] = price.astype(np.int64)
+            h['change_pct'] = change
+
+            rules = (
+                ('STOP_LOSS', (stop_loss > 0) & (price > 0) & (price <= stop_loss),
+                 lambda r: f"Price {r.price / SCALING_FACTOR:.2f} hit stop-loss {r.stop_loss / SCALING_FACTOR:.2f}"),
+                ('TARGET', (target > 0) & (price >= target),
+                 lambda r: f"Price {r.price / SCALING_FACTOR:.2f} reached target {r.target_price / SCALING_FACTOR:.2f}"),
+                ('STRATEGY_MOVE', np.abs(change) >= move_limit,
+                 lambda r: f"{r.strategy_mode} position moved {r.change_pct:+.2f}%"),
+            )
+            for rule, mask, describe in rules:
+                hit = h[mask]
+                if not hit.empty:
+                    hit = hit.assign(rule=rule, message=[describe(r) for r in hit.itertuples()])
+                    frames.append(hit[ALERT_COLUMNS])
+
+        if symbols is not None:
+            moves = moves[moves['symbol'].isin(list(symbols))]
+        if not moves.empty:
+            change = moves['change_pct'].to_numpy(dtype=np.float64, na_value=np.nan)
+            hit = moves[np.abs(change) >= MARKET_MOVE_THRESHOLD]
+            if not hit.empty:
+                hit = hit.assign(
+                    rule='MARKET_MOVE',
+                    event_date=pd.to_datetime(hit['event_date']).dt.strftime('%Y-%m-%d'),
+                    price=hit['close'].astype(np.int64),
+                    message=[f"Daily move {c:+.2f}%" for c in hit['change_pct']],
+                )
+                frames.append(hit[ALERT_COLUMNS])
+
+        if not frames:
+            return pd.DataFrame(columns=ALERT_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    def run(self, as_of: Optional[date] = None, symbols: Optional[Iterable[str]] = None) -> int:
+        """Evaluates all rules and stores new alerts. Returns the number of new alerts."""
+        alerts = self.evaluate(as_of, symbols)
+        if alerts.empty:
+            return 0
+
+        conn = self.pfolio_db._get_connection()
+        before = conn.total_changes
+        rows = [
+            (r.symbol, r.rule, r.event_date, int(r.price),
+             None if pd.isna(r.change_pct) else float(r.change_pct), r.message)
+            for r in alerts.itertuples(index=False)
+        ]
+        conn.executemany("""
+            INSERT OR IGNORE INTO alerts (symbol, rule, event_date, price, change_pct, message)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, rows)
+        conn.commit()
+
+        new_alerts = conn.total_changes - before
+        logger.info(f"Alert evaluation: {len(alerts)} triggered, {new_alerts} new.")
+        return new_alerts
@@ -0,0 +1,272 @@
+import os
+import sys
+import time
+import shutil
+import logging
+import multiprocessing
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Iterable, List, Optional
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from pyfolio_core.core.database import MarketDatabase
+from pyfolio_core.core.constants import BENCHMARK_SYMBOL, ANALYTICS_WINDOW
+
+logger = logging.getLogger("PyFolio-Core")
+
+def _load_log_returns(conn, source: str, symbols: Optional[List[str]] = None,
+                      start: Optional[object] = None) -> pd.DataFrame:
+    """Dates x symbols matrix of daily log returns, read straight from the Parquet snapshot."""
+    sql = "SELECT symbol, event_date, close FROM read_parquet(?) WHERE close > 0"
+    params = [source]
+    if symbols is not None:
+        sql += " AND list_contains(?, symbol)"
+        params.append(symbols)
+    if start is not None:
+        sql += " AND event_date >= ?"
+        params.append(start)
+
+    df = conn.execute(sql, params).df()
+    if df.empty:
+        return pd.DataFrame()
+    wide = df.pivot(index='event_date', columns='symbol', values='close').sort_index()
+    return np.log(wide.astype(np.float64)).diff().iloc[1:]
+
+def _window_sums(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing 'window'-row sums for every row and column (O(T) via cumulative sums)."""
+    cs = np.vstack([np.zeros((1, values.shape[1])), np.cumsum(values, axis=0)])
+    if len(values) <= window:
+        return cs[1:]
+    lagged = np.vstack([np.zeros((window, values.shape[1])), cs[1:len(values) - window + 1]])
+    return cs[1:] - lagged
+
+class AnalyticsJob(ABC):
+    """
+    A CPU-bound computation over a shard of symbols.
+    compute() runs inside a worker process and must only use its arguments:
+    it reads prices from the Parquet snapshot and returns a frame whose
+    columns match 'result_table'.
+    """
+    result_table: str = ""
+    shards_per_worker: int = 4  # >1 balances uneven shards; 1 when every shard loads shared data
+
+    @abstractmethod
+    def compute(self, conn, source: str, shard: List[str]) -> pd.DataFrame:
+        pass
+
+class BetaJob(AnalyticsJob):
+    """
+    Rolling OLS of each symbol's daily log returns on the benchmark (XU100):
+    beta, alpha, correlation and R² over the trailing 'window' bars.
+    history=False keeps only the last date per symbol.
+    """
+    result_table = "analytics_beta"
+
+    def __init__(self, benchmark: str = BENCHMARK_SYMBOL, window: int = ANALYTICS_WINDOW,
+                 min_observations: int = 60, history: bool = False):
+        self.benchmark = benchmark
+        self.window = window
+        self.min_observations = min_observations
+        self.history = history
+
+    def compute(self, conn, source: str, shard: List[str]) -> pd.DataFrame:
+
+        returns = _load_log_returns(conn, source, list(shard) + [self.benchmark])
+        if returns.empty or self.benchmark not in returns:
+            return pd.DataFrame()
+
+        symbols = [s for s in returns.columns if s != self.benchmark]
+        x = returns[self.benchmark].to_numpy()
+        y = returns[symbols].to_numpy()
+
+        # Pairwise-complete observations only
+        mask = ~np.isnan(y) & ~np.isnan(x)[:, None]
+        xm = np.where(mask, x[:, None], 0.0)
+        ym = np.where(mask, y, 0.0)
+
+        n = _window_sums(mask.astype(np.float64), self.window)
+        sx, sy = _window_sums(xm, self.window), _window_sums(ym, self.window)
+        sxx, syy, sxy = _window_sums(xm * xm, self.window), _window_sums(ym * ym, self.window), _window_sums(xm * ym, self.window)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = sxy - sx * sy / n
+            var_x = sxx - sx * sx / n
+            var_y = syy - sy * sy / n
+            beta = cov / var_x
+            alpha = (sy - beta * sx) / n
+            corr = cov / np.sqrt(var_x * var_y)
+
+        rows = slice(None) if self.history else slice(-1, None)
+        dates = returns.index.to_numpy()[rows]
+        n, beta, alpha, corr = n[rows], beta[rows], alpha[rows], corr[rows]
+        valid = n >= self.min_observations
+        t_idx, s_idx = np.nonzero(valid)
+
+        return pd.DataFrame({
+            'symbol': np.asarray(symbols, dtype=object)[s_idx],
+            'event_date': dates[t_idx],
+            'window': self.window,
+            'benchmark': self.benchmark,
+            'beta': beta[t_idx, s_idx],
+            'alpha': alpha[t_idx, s_idx],
+            'correlation': corr[t_idx, s_idx],
+            'r_squared': corr[t_idx, s_idx] ** 2,
+            'observations': n[t_idx, s_idx].astype(np.int32),
+        })
+
+class CorrelationJob(AnalyticsJob):
+    """
+    Exchange-wide correlation matrix of daily log returns over the last
+    'window' trading days. Each shard computes its rows of the matrix
+    (shard x universe) as one matrix product; only the upper triangle is kept.
+    Missing days count as zero (de-meaned) returns, which slightly shrinks
+    correlations of thinly traded symbols.
+    """
+    result_table = "analytics_correlation"
+    shards_per_worker = 1
+
+    def __init__(self, window: int = ANALYTICS_WINDOW, min_observations: int = 60):
+        self.window = window
+        self.min_observations = min_observations
+
+    def compute(self, conn, source: str, shard: List[str]) -> pd.DataFrame:
+
+        days = conn.execute("""
+            SELECT DISTINCT event_date FROM read_parquet(?) ORDER BY event_date DESC LIMIT ?
+        """, (source, self.window + 1)).fetchall()
+        if not days:
+            return pd.DataFrame()
+
+        returns = _load_log_returns(conn, source, start=days[-1][0])
+        returns = returns.loc[:, returns.count() >= self.min_observations]
+        if returns.empty:
+            return pd.DataFrame()
+
+        values = returns.to_numpy()
+        counts = (~np.isnan(values)).sum(axis=0)
+        z = (values - np.nanmean(values, axis=0)) / np.nanstd(values, axis=0, ddof=1)
+        z = np.nan_to_num(z, nan=0.0, posinf=0.0, neginf=0.0)
+
+        universe = returns.columns.to_numpy(dtype=object)
+        rows = np.flatnonzero(np.isin(universe, shard))
+        if not len(rows):
+            return pd.DataFrame()
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            block = (z[:, rows].T @ z) / np.sqrt(np.outer(counts[rows] - 1, counts - 1))
+
+        a_idx, b_idx = np.nonzero(universe[rows][:, None] < universe[None, :])
+        return pd.DataFrame({
+            'as_of': returns.index[-1],
+            'window': self.window,
+            'symbol_a': universe[rows][a_idx],
+            'symbol_b': universe[b_idx],
+            'correlation': np.clip(block[a_idx, b_idx], -1.0, 1.0),
+        })
+
+def _run_shard(job: AnalyticsJob, source: str, shard: List[str], output: str) -> Optional[str]:
+    """Worker entry point: private in-memory DuckDB over the snapshot, result -> Parquet."""
+    conn = duckdb.connect()
+    try:
+        result = job.compute(conn, source, shard)
+        if result is None or result.empty:
+            return None
+        conn.register('shard_result', result)
+        conn.execute(f"COPY shard_result TO '{output}' (FORMAT PARQUET)")
+        return output
+    finally:
+        conn.close()
+
+class BatchAnalyticsRunner:
+    """
+    Runs AnalyticsJob instances over all symbols with a process pool.
+
+    daily_prices is exported once to a symbol-sorted Parquet snapshot. Workers
+    receive only symbol lists, read their shard from the snapshot (row-group
+    pruning on symbol) and write results to Parquet; the parent merges those
+    files into the job's result table. No price frame is ever pickled, and the
+    DuckDB file is never opened by two processes.
+    """
+
+    def __init__(self, market_db: MarketDatabase, workers: Optional[int] = None,
+                 work_dir: str = "data/analytics"):
+
+        self.market_db = market_db
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.work_dir = work_dir
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.work_dir, "daily_prices.parquet")
+
+    def snapshot(self) -> str:
+        """Exports (symbol, event_date, close) sorted by symbol for shard-wise reads."""
+        os.makedirs(self.work_dir, exist_ok=True)
+        self.market_db._get_connection().execute(f"""
+            COPY (
+                SELECT s.symbol, p.event_date, p.close
+                FROM daily_prices_compact p
+                JOIN symbols s USING (symbol_id)
+                ORDER BY s.symbol, p.event_date
+            )
+            TO '{self.snapshot_path}' (FORMAT PARQUET, ROW_GROUP_SIZE 100000)
+        """)
+        return self.snapshot_path
+
+    def run(self, job: AnalyticsJob, symbols: Optional[Iterable[str]] = None,
+            refresh_snapshot: bool = True) -> int:
+        """Computes the job for 'symbols' (default: every symbol) and stores the result. Returns rows stored."""
+        source = self.snapshot() if refresh_snapshot or not os.path.exists(self.snapshot_path) else self.snapshot_path
+        conn = self.market_db._get_connection()
+
+        if symbols is None:
+            symbols = [row[0] for row in conn.execute(
+                "SELECT DISTINCT symbol FROM read_parquet(?) ORDER BY symbol", (source,)).fetchall()]
+        symbols = sorted(set(symbols))
+        if not symbols:
+            return 0
+
+        shard_count = min(len(symbols), self.workers * job.shards_per_worker)
+        shards = [list(s) for s in np.array_split(np.asarray(symbols, dtype=object), shard_count)]
+
+        out_dir = os.path.join(self.work_dir, f"{job.result_table}.parts")
+        shutil.rmtree(out_dir, ignore_errors=True)
+        os.makedirs(out_dir)
+        outputs = [os.path.join(out_dir, f"part_{i:05d}.parquet") for i in range(len(shards))]
+
+        started = time.perf_counter()
+        if self.workers == 1:
+            parts = [_run_shard(job, source, shard, out) for shard, out in zip(shards, outputs)]
+        else:
+            # spawn: never fork a process that holds an open DuckDB connection
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+                parts = list(pool.map(_run_shard, repeat(job), repeat(source), shards, outputs))
+        parts = [p for p in parts if p]
+
+        stored = 0
+        if parts:
+            conn.execute(f"INSERT OR REPLACE INTO {job.result_table} SELECT * FROM read_parquet(?)", (parts,))
+            stored = conn.execute("SELECT count(*) FROM read_parquet(?)", (parts,)).fetchone()[0]
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+        logger.info(f"{type(job).__name__}: {len(symbols)} symbols, {len(shards)} shards, "
+                    f"{self.workers} workers -> {stored} rows in {time.perf_counter() - started:.2f}s")
+        return stored
+
+# --- BENCHMARK ---
+if __name__ == "__main__":
+    # python -m pyfolio_core.core.analytics data/GlobalMarket.duckdb
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    market_db = MarketDatabase(sys.argv[1] if len(sys.argv) > 1 else "data/GlobalMarket.duckdb")
+
+    for job in (BetaJob(history=True), CorrelationJob()):
+        for workers in (1, 2, 4, 8):
+            runner = BatchAnalyticsRunner(market_db, workers=workers)
+            started = time.perf_counter()
+            runner.run(job, refresh_snapshot=(workers == 1))
+            print(f"{type(job).__name__:<15} workers={workers}: {time.perf_counter() - started:.2f}s")
@@ -1,2 +1,23 @@
 # MONEY PATTERN CONSTANTS
-SCALING_FACTOR = 1000000
\ No newline at end of file
+SCALING_FACTOR = 1000000
+
+# FX CONSTANTS
+# Rates are stored with the same SCALING_FACTOR (1 USDTRY = 34.25 -> 34250000)
+DEFAULT_FX_PAIRS = ("USDTRY", "EURTRY", "GBPTRY", "EURUSD")
+PIVOT_CURRENCY = "TRY"
+
+# ALERT RULES
+# Absolute daily move (%) that raises a STRATEGY_MOVE alert for a holding, per strategy_mode
+STRATEGY_MOVE_THRESHOLDS = {"TANK": 3.0, "ATTACK": 7.0}
+# Absolute daily move (%) that raises a MARKET_MOVE alert for any symbol
+MARKET_MOVE_THRESHOLD = 10.0
+
+# DATA QUALITY
+# close / previous close outside [1/R, R] is treated as a scaling error
+MAX_PRICE_JUMP_RATIO = 10.0
+# Stored history (days before the batch) searched for a symbol's previous bar
+VALIDATION_LOOKBACK_DAYS = 30
+
+# ANALYTICS
+BENCHMARK_SYMBOL = "XU100"    # BIST 100 index, must be synced into daily_prices
+ANALYTICS_WINDOW = 252        # Trading days (~1 year)
@@ -2,6 +2,9 @@ import os
 import logging
 import sqlite3
 import duckdb
+import pandas as pd
+from datetime import date
+from typing import Iterable, Optional
 
 
 logger = logging.getLogger("PyFolio-Core")
@@ -16,13 +19,12 @@ class MarketDatabase:
         
     def _connect(self):
         
-        schema_exists = os.path.exists(self.db_path)
         if not self._conn:
             try:
                 self._conn = duckdb.connect(self.db_path)
                 logger.info(f"Connected to DuckDB: {self.db_path}")
-                if not schema_exists:
-                    self._init_schema()
+                # Idempotent: also brings older files up to the current schema.
+                self._init_schema()
             except Exception as e:
                 logger.error(f"DuckDB Connection Error: {e}")
                 raise  
@@ -31,22 +33,52 @@ class MarketDatabase:
         
         try:
             ### CREATE TABLES
-            # TABLE: "DailyPrices"
+            # TABLE: "Symbols" (dictionary: every price row references an integer id)
+            self._conn.execute("CREATE SEQUENCE IF NOT EXISTS symbol_id_seq START 1;")
             self._conn.execute("""
-                CREATE TABLE IF NOT EXISTS daily_prices (
-                    symbol VARCHAR,
+                CREATE TABLE IF NOT EXISTS symbols (
+                    symbol_id INTEGER PRIMARY KEY DEFAULT nextval('symbol_id_seq'),
+                    symbol VARCHAR UNIQUE NOT NULL,
+                    exchange VARCHAR          -- Source of the first ingested batch (e.g. 'BIST', 'TEFAS')
+                );
+            """)
+            self._conn.execute("ALTER TABLE symbols ADD COLUMN IF NOT EXISTS exchange VARCHAR;")
+            
+            # TABLE: "DailyPricesCompact" (daily_prices keyed by symbol_id instead of the VARCHAR symbol)
+            self._migrate_delta_daily_prices()
+            self._conn.execute(self.DAILY_PRICES_COMPACT_DDL)
+            
+            self._migrate_legacy_daily_prices()
+            
+            # VIEW: "DailyPrices" (the original column layout for external readers;
+            # internal readers use daily_prices_compact + symbol_id, writes go through upsert_daily_prices)
+            self._conn.execute("""
+                CREATE OR REPLACE VIEW daily_prices AS
+                    SELECT 
+                        s.symbol,
+                        p.event_date,
+                        p.open,
+                        p.high,
+                        p.low,
+                        p.close,
+                        p.volume
+                    FROM daily_prices_compact p
+                    JOIN symbols s USING (symbol_id);
+            """)
+            
+            # TABLE: "FxRates"
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS fx_rates (
+                    base_currency VARCHAR,
+                    quote_currency VARCHAR,
                     event_date DATE,
-                    open BIGINT,
-                    high BIGINT,
-                    low BIGINT,
-                    close BIGINT,
-                    volume DOUBLE,        -- Hacim para değildir, adet/lot küsuratlı olabilir.
-                    PRIMARY KEY (symbol, event_date)
+                    rate BIGINT,          -- 1 BASE = rate / SCALING_FACTOR QUOTE
+                    PRIMARY KEY (base_currency, quote_currency, event_date)
                 );
             """)
             
             self._conn.execute("""
-                CREATE VIEW view_market_signals AS
+                CREATE OR REPLACE VIEW view_market_signals AS
                     SELECT 
                         symbol,
                         event_date,
@@ -56,6 +88,85 @@ class MarketDatabase:
                     FROM daily_prices;
             """)
 
+            # TABLE: "QuarantinePrices" (rows rejected by PriceValidator, never upserted)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS quarantine_prices (
+                    symbol VARCHAR,
+                    event_date DATE,
+                    open BIGINT,
+                    high BIGINT,
+                    low BIGINT,
+                    close BIGINT,
+                    volume DOUBLE,
+                    prev_close BIGINT,        -- Reference close used by the checks
+                    reason VARCHAR,           -- QuarantineReason code
+                    source VARCHAR,           -- Exchange / feed of the batch
+                    quarantined_at TIMESTAMP DEFAULT current_timestamp
+                );
+            """)
+
+            # TABLE: "ChangeLog" (append-only; written together with every daily_prices upsert)
+            self._conn.execute("CREATE SEQUENCE IF NOT EXISTS change_log_seq START 1;")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS change_log (
+                    seq BIGINT PRIMARY KEY DEFAULT nextval('change_log_seq'),
+                    table_name VARCHAR,
+                    operation VARCHAR,        -- 'INSERT' or 'UPDATE'
+                    row_key JSON,             -- e.g. {"symbol": "THYAO", "event_date": "2024-01-02"}
+                    old_values JSON,          -- NULL for inserts
+                    new_values JSON,
+                    changed_at TIMESTAMP DEFAULT current_timestamp
+                );
+            """)
+
+            # TABLES: Batch analytics results (BatchAnalyticsRunner)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS analytics_beta (
+                    symbol VARCHAR,
+                    event_date DATE,
+                    "window" INTEGER,         -- Regression window (bars)
+                    benchmark VARCHAR,
+                    beta DOUBLE,
+                    alpha DOUBLE,             -- Daily log-return intercept
+                    correlation DOUBLE,
+                    r_squared DOUBLE,
+                    observations INTEGER,
+                    PRIMARY KEY (symbol, event_date, "window", benchmark)
+                );
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS analytics_correlation (
+                    as_of DATE,
+                    "window" INTEGER,
+                    symbol_a VARCHAR,         -- symbol_a < symbol_b (upper triangle only)
+                    symbol_b VARCHAR,
+                    correlation DOUBLE,
+                    PRIMARY KEY (as_of, "window", symbol_a, symbol_b)
+                );
+            """)
+
+            # TABLE: "MarketScreener" (one cross-sectional row per symbol and day, ranked per exchange)
+            self._migrate_market_screener()
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS market_screener (
+                    event_date DATE,
+                    exchange VARCHAR,
+                    symbol VARCHAR,
+                    close BIGINT,
+                    change_pct DOUBLE,        -- vs. previous bar
+                    return_1m_pct DOUBLE,     -- vs. last close 30 days earlier
+                    volume DOUBLE,
+                    volume_zscore DOUBLE,     -- vs. the previous 30 days of volume
+                    high_52w BIGINT,
+                    low_52w BIGINT,
+                    is_52w_high BOOLEAN,      -- NULL with less than a year of history
+                    is_52w_low BOOLEAN,
+                    change_rank DOUBLE,       -- percentile (0-1) of change_pct within the exchange and day
+                    volume_rank DOUBLE,       -- percentile (0-1) of volume_zscore within the exchange and day
+                    PRIMARY KEY (event_date, symbol)
+                );
+            """)
+
             self._conn.commit()
             logger.info("DuckDB Schema initialized (STRICT INTEGER MODE).")
             
@@ -63,6 +174,348 @@ class MarketDatabase:
             logger.error(f"DuckDB Schema Initialization Error: {e}")
             raise
 
+    ### STORAGE
+    # No PRIMARY KEY: its ART index is ~40% of the file and makes bulk loads ~2x and
+    # daily upserts ~3x slower (see the benchmark in __main__). (symbol_id, event_date)
+    # stays unique because upsert_daily_prices is the only writer: it rejects batches
+    # with repeated keys and deletes the batch keys before inserting.
+    DAILY_PRICES_COMPACT_DDL = """
+        CREATE TABLE IF NOT EXISTS daily_prices_compact (
+            symbol_id INTEGER,
+            event_date DATE,
+            open BIGINT,
+            high BIGINT,
+            low BIGINT,
+            close BIGINT,
+            volume DOUBLE         -- Hacim para değildir, adet/lot küsuratlı olabilir.
+        );
+    """
+
+    def _migrate_market_screener(self):
+        """The screener is derived data: a table without 'exchange' is dropped (re-run backfill_screener)."""
+        columns = {row[0] for row in self._conn.execute("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_schema = 'main' AND table_name = 'market_screener'
+        """).fetchall()}
+        if columns and 'exchange' not in columns:
+            self._conn.execute("DROP TABLE market_screener")
+            logger.warning("market_screener dropped for the exchange column; run backfill_screener() to rebuild it.")
+
+    def _migrate_legacy_daily_prices(self):
+        """
+        Moves a pre-dictionary 'daily_prices' table (VARCHAR symbol, four BIGINT
+        prices per row) into symbols + daily_prices_compact, in one transaction.
+        DuckDB reuses the freed blocks but does not shrink the file; copy the
+        database (see the benchmark in __main__) to reclaim the disk space.
+        """
+        table_type = self._conn.execute("""
+            SELECT table_type FROM information_schema.tables
+            WHERE table_schema = 'main' AND table_name = 'daily_prices'
+        """).fetchone()
+        if table_type is None or table_type[0] != 'BASE TABLE':
+            return
+
+        logger.info("Migrating daily_prices to the symbol dictionary layout...")
+        self._conn.execute("BEGIN TRANSACTION")
+        try:
+            self._conn.execute("ALTER TABLE daily_prices RENAME TO daily_prices_legacy")
+            self._conn.execute("""
+                INSERT INTO symbols (symbol)
+                SELECT DISTINCT symbol FROM daily_prices_legacy
+                WHERE symbol NOT IN (SELECT symbol FROM symbols)
+                ORDER BY symbol
+            """)
+            self._conn.execute("""
+                INSERT INTO daily_prices_compact
+                SELECT s.symbol_id, CAST(b.event_date AS DATE), b.open, b.high, b.low, b.close, b.volume
+                FROM daily_prices_legacy b
+                JOIN symbols s USING (symbol)
+                ORDER BY s.symbol_id, b.event_date
+            """)
+            rows = self._conn.execute("SELECT count(*) FROM daily_prices_compact").fetchone()[0]
+            self._conn.execute("DROP TABLE daily_prices_legacy")
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("CHECKPOINT")
+        logger.info(f"daily_prices migrated: {rows} rows.")
+
+    def _migrate_delta_daily_prices(self):
+        """
+        Rewrites a daily_prices_compact table in the earlier int32 offset layout
+        (open/high/low stored as *_delta from close, *_full on overflow) with
+        plain BIGINT OHLC, in one transaction.
+        """
+        columns = {row[0] for row in self._conn.execute("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_schema = 'main' AND table_name = 'daily_prices_compact'
+        """).fetchall()}
+        if 'open_delta' not in columns:
+            return
+
+        logger.info("Migrating daily_prices_compact from OHLC offsets to BIGINT...")
+        self._conn.execute("BEGIN TRANSACTION")
+        try:
+            self._conn.execute("ALTER TABLE daily_prices_compact RENAME TO daily_prices_delta")
+            self._conn.execute(self.DAILY_PRICES_COMPACT_DDL)
+            self._conn.execute("""
+                INSERT INTO daily_prices_compact
+                SELECT
+                    symbol_id, event_date,
+                    COALESCE(close + open_delta, open_full),
+                    COALESCE(close + high_delta, high_full),
+                    COALESCE(close + low_delta, low_full),
+                    close, volume
+                FROM daily_prices_delta
+                ORDER BY symbol_id, event_date
+            """)
+            rows = self._conn.execute("SELECT count(*) FROM daily_prices_compact").fetchone()[0]
+            self._conn.execute("DROP TABLE daily_prices_delta")
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("CHECKPOINT")
+        logger.info(f"daily_prices_compact migrated: {rows} rows.")
+
+    def symbol_map(self) -> pd.Series:
+        """symbol_id -> symbol. Readers filter/aggregate on symbol_id and resolve names last."""
+        df = self._get_connection().execute("SELECT symbol_id, symbol FROM symbols").df()
+        return pd.Series(df['symbol'].to_numpy(), index=df['symbol_id'].to_numpy(), name='symbol')
+
+    def upsert_daily_prices(self, relation: str, exchange: Optional[str] = None) -> None:
+        """
+        Inserts or updates the rows of a registered relation / table with the
+        original columns (symbol, event_date, open, high, low, close, volume).
+        Keys must be unique within the relation (PriceValidator guarantees it),
+        otherwise ValueError is raised before anything is written. New symbols are added to the dictionary first, tagged with 'exchange'
+        (symbols without one get it too). Caller owns the transaction.
+        """
+        conn = self._get_connection()
+        repeated = conn.execute(f"""
+            SELECT count(*) - count(DISTINCT (symbol, CAST(event_date AS DATE))) FROM {relation}
+        """).fetchone()[0]
+        if repeated:
+            raise ValueError(f"{relation} has {repeated} repeated (symbol, event_date) keys.")
+
+        conn.execute(f"""
+            INSERT INTO symbols (symbol, exchange)
+            SELECT DISTINCT symbol, CAST(? AS VARCHAR) FROM {relation}
+            WHERE symbol NOT IN (SELECT symbol FROM symbols)
+        """, (exchange,))
+        if exchange is not None:
+            conn.execute(f"""
+                UPDATE symbols SET exchange = ?
+                WHERE exchange IS NULL AND symbol IN (SELECT symbol FROM {relation})
+            """, (exchange,))
+        # Upsert = delete the batch keys, then insert (the table has no key index)
+        conn.execute(f"""
+            DELETE FROM daily_prices_compact p
+            USING {relation} b, symbols s
+            WHERE s.symbol = b.symbol
+              AND p.symbol_id = s.symbol_id
+              AND p.event_date = CAST(b.event_date AS DATE)
+        """)
+        conn.execute(f"""
+            INSERT INTO daily_prices_compact
+            SELECT s.symbol_id, CAST(b.event_date AS DATE), b.open, b.high, b.low, b.close, b.volume
+            FROM {relation} b
+            JOIN symbols s USING (symbol)
+        """)
+
+    ### SCREENER
+    SCREENER_SORT_COLUMNS = ('change_pct', 'return_1m_pct', 'volume', 'volume_zscore',
+                             'change_rank', 'volume_rank', 'close', 'symbol')
+
+    def refresh_screener(self, event_date: Optional[date] = None, exchange: Optional[str] = None) -> int:
+        """
+        Computes the 'market_screener' rows of one exchange and day; ranks are
+        taken within that exchange. Default day: the exchange's own latest bar.
+        Without 'exchange' every exchange is refreshed on its own latest day.
+        Only one year of history before the day is scanned. Call once per sync;
+        returns the number of symbols summarized.
+        """
+        conn = self._get_connection()
+        if exchange is None:
+            exchanges = [row[0] for row in conn.execute("SELECT DISTINCT exchange FROM symbols").fetchall()]
+            return sum(self._refresh_screener_exchange(event_date, ex) for ex in exchanges)
+        return self._refresh_screener_exchange(event_date, exchange)
+
+    def _refresh_screener_exchange(self, event_date: Optional[date], exchange: Optional[str]) -> int:
+
+        conn = self._get_connection()
+        # Symbols ingested before exchanges were tracked form their own (NULL) cross-section
+        members = "SELECT symbol_id FROM symbols WHERE exchange IS NOT DISTINCT FROM CAST($x AS VARCHAR)"
+        event_date = event_date or conn.execute(f"""
+            SELECT max(event_date) FROM daily_prices_compact WHERE symbol_id IN ({members})
+        """, {'x': exchange}).fetchone()[0]
+        if event_date is None:
+            return 0
+
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            conn.execute("""
+                DELETE FROM market_screener
+                WHERE event_date = ? AND exchange IS NOT DISTINCT FROM CAST(? AS VARCHAR)
+            """, (event_date, exchange))
+            conn.execute(f"""
+                INSERT INTO market_screener
+                WITH hist AS (
+                    SELECT p.symbol_id, p.event_date, p.high, p.low, p.close, p.volume
+                    FROM daily_prices_compact p
+                    WHERE p.event_date BETWEEN CAST($d AS DATE) - INTERVAL 365 DAY AND CAST($d AS DATE)
+                      AND p.symbol_id IN ({members})
+                ),
+                stats AS (
+                    SELECT
+                        symbol_id,
+                        max(close) FILTER (WHERE event_date = $d) AS close,
+                        max(high) FILTER (WHERE event_date = $d) AS high,
+                        max(low) FILTER (WHERE event_date = $d) AS low,
+                        max(volume) FILTER (WHERE event_date = $d) AS volume,
+                        arg_max(close, event_date) FILTER (WHERE event_date < $d) AS prev_close,
+                        arg_max(close, event_date) FILTER (WHERE event_date <= CAST($d AS DATE) - INTERVAL 30 DAY) AS close_1m,
+                        avg(volume) FILTER (WHERE event_date < $d AND event_date >= CAST($d AS DATE) - INTERVAL 30 DAY) AS volume_avg,
+                        stddev_samp(volume) FILTER (WHERE event_date < $d AND event_date >= CAST($d AS DATE) - INTERVAL 30 DAY) AS volume_std,
+                        max(high) AS high_52w,
+                        min(low) AS low_52w,
+                        min(event_date) AS first_date
+                    FROM hist
+                    GROUP BY symbol_id
+                    HAVING count(*) FILTER (WHERE event_date = $d) > 0
+                ),
+                summary AS (
+                    SELECT
+                        s.exchange, s.symbol, close, volume, high_52w, low_52w,
+                        ROUND((close - prev_close) * 100.0 / NULLIF(prev_close, 0), 2) AS change_pct,
+                        ROUND((close - close_1m) * 100.0 / NULLIF(close_1m, 0), 2) AS return_1m_pct,
+                        ROUND((volume - volume_avg) / NULLIF(volume_std, 0), 2) AS volume_zscore,
+                        -- 52w flags need about a year of bars (one week of slack for holidays)
+                        CASE WHEN first_date <= CAST($d AS DATE) - INTERVAL 358 DAY THEN high >= high_52w END AS is_52w_high,
+                        CASE WHEN first_date <= CAST($d AS DATE) - INTERVAL 358 DAY THEN low <= low_52w END AS is_52w_low
+                    FROM stats
+                    JOIN symbols s USING (symbol_id)
+                )
+                SELECT
+                    CAST($d AS DATE), exchange, symbol, close, change_pct, return_1m_pct, volume, volume_zscore,
+                    high_52w, low_52w, is_52w_high, is_52w_low,
+                    CASE WHEN change_pct IS NOT NULL THEN
+                        PERCENT_RANK() OVER (PARTITION BY exchange, change_pct IS NULL ORDER BY change_pct) END,
+                    CASE WHEN volume_zscore IS NOT NULL THEN
+                        PERCENT_RANK() OVER (PARTITION BY exchange, volume_zscore IS NULL ORDER BY volume_zscore) END
+                FROM summary
+            """, {'d': event_date, 'x': exchange})
+            count = conn.execute("""
+                SELECT count(*) FROM market_screener
+                WHERE event_date = ? AND exchange IS NOT DISTINCT FROM CAST(? AS VARCHAR)
+            """, (event_date, exchange)).fetchone()[0]
+            conn.execute("COMMIT")
+        except Exception as e:
+            conn.execute("ROLLBACK")
+            logger.error(f"Screener refresh failed ({exchange} {event_date}): {e}")
+            raise
+
+        logger.info(f"Screener refreshed: {exchange} {event_date} ({count} symbols).")
+        return count
+
+    def backfill_screener(self, start: Optional[date] = None, end: Optional[date] = None,
+                          exchange: Optional[str] = None) -> int:
+        """Refreshes every trading day in [start, end] (all exchanges by default). For first-time setup only."""
+        conn = self._get_connection()
+        days = conn.execute("""
+            SELECT DISTINCT event_date FROM daily_prices_compact
+            WHERE event_date >= COALESCE(CAST(? AS DATE), DATE '1900-01-01')
+              AND event_date <= COALESCE(CAST(? AS DATE), DATE '9999-12-31')
+            ORDER BY event_date
+        """, (start, end)).fetchall()
+        return sum(self.refresh_screener(row[0], exchange) for row in days)
+
+    def screen(self, event_date: Optional[date] = None, exchange: Optional[str] = None,
+               min_change_pct: Optional[float] = None, max_change_pct: Optional[float] = None,
+               min_volume_zscore: Optional[float] = None,
+               only_52w_high: bool = False, only_52w_low: bool = False,
+               symbols: Optional[Iterable[str]] = None,
+               sort_by: str = 'change_pct', descending: bool = True, limit: Optional[int] = 50) -> pd.DataFrame:
+        """
+        Filters and sorts the precomputed cross-section of one day
+        (default: latest screened day of 'exchange', or of any exchange).
+        Prices are scaled integers.
+        """
+        if sort_by not in self.SCREENER_SORT_COLUMNS:
+            raise ValueError(f"Unsupported sort column: {sort_by}. Use one of {self.SCREENER_SORT_COLUMNS}.")
+
+        sql = """
+            SELECT * FROM market_screener
+            WHERE event_date = COALESCE(CAST(? AS DATE), (
+                SELECT max(event_date) FROM market_screener
+                WHERE CAST(? AS VARCHAR) IS NULL OR exchange = ?
+            ))
+        """
+        params = [event_date, exchange, exchange]
+        if exchange is not None:
+            sql += " AND exchange = ?"
+            params.append(exchange)
+        if min_change_pct is not None:
+            sql += " AND change_pct >= ?"
+            params.append(min_change_pct)
+        if max_change_pct is not None:
+            sql += " AND change_pct <= ?"
+            params.append(max_change_pct)
+        if min_volume_zscore is not None:
+            sql += " AND volume_zscore >= ?"
+            params.append(min_volume_zscore)
+        if only_52w_high:
+            sql += " AND is_52w_high"
+        if only_52w_low:
+            sql += " AND is_52w_low"
+        if symbols is not None:
+            sql += " AND list_contains(?, symbol)"
+            params.append(list(symbols))
+
+        sql += f" ORDER BY {sort_by} {'DESC' if descending else 'ASC'} NULLS LAST"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        return self._get_connection().execute(sql, params).df()
+
+    def top_gainers(self, limit: int = 20, event_date: Optional[date] = None,
+                    exchange: Optional[str] = None) -> pd.DataFrame:
+        return self.screen(event_date, exchange, sort_by='change_pct', limit=limit)
+
+    def top_losers(self, limit: int = 20, event_date: Optional[date] = None,
+                   exchange: Optional[str] = None) -> pd.DataFrame:
+        return self.screen(event_date, exchange, sort_by='change_pct', descending=False, limit=limit)
+
+    def volume_spikes(self, min_zscore: float = 3.0, limit: int = 50, event_date: Optional[date] = None,
+                      exchange: Optional[str] = None) -> pd.DataFrame:
+        return self.screen(event_date, exchange, min_volume_zscore=min_zscore, sort_by='volume_zscore', limit=limit)
+
+    def new_52w_highs(self, limit: Optional[int] = None, event_date: Optional[date] = None,
+                      exchange: Optional[str] = None) -> pd.DataFrame:
+        return self.screen(event_date, exchange, only_52w_high=True, limit=limit)
+
+    ### CHANGE FEED
+    def changes_since(self, seq: int = 0, table_name: Optional[str] = None, limit: Optional[int] = None) -> pd.DataFrame:
+        """
+        Change log entries with seq > 'seq', oldest first. Consumers keep the
+        last seq they processed and pass it back on the next refresh.
+        """
+        sql = "SELECT * FROM change_log WHERE seq > ?"
+        params = [int(seq)]
+        if table_name is not None:
+            sql += " AND table_name = ?"
+            params.append(table_name)
+        sql += " ORDER BY seq"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return self._get_connection().execute(sql, params).df()
+
+    def latest_change_seq(self) -> int:
+        return self._get_connection().execute("SELECT COALESCE(max(seq), 0) FROM change_log").fetchone()[0]
+
     def close(self):
         
         if self._conn:
@@ -92,13 +545,17 @@ class PortfolioDatabase:
         
     def _connect(self):
         
-        schema_exists = os.path.exists(self.db_path)
         if not self._conn:
             try:
                 self._conn = sqlite3.connect(self.db_path)
                 logger.info(f"Connected to Sqlite: {self.db_path}")
+                # An existing file is not enough: older versions could leave an empty one behind
+                schema_exists = self._conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'portfolio_assets'").fetchone()
                 if not schema_exists:
                     self._init_schema()
+                else:
+                    self._migrate_schema()
             except Exception as e:
                 logger.error(f"Sqlite Connection Error: {e}")
                 raise  
@@ -122,13 +579,14 @@ class PortfolioDatabase:
                         target_price INTEGER DEFAULT 0,     -- Take profit price
                         
                         asset_type TEXT DEFAULT 'STOCK',
+                        currency TEXT DEFAULT 'TRY',        -- Quote currency of current_price / average_cost (set by the price services)
                         last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     );
                 """)
             
             # TABLE: "Trade Logs"
             self.execute("""
-                    CREATE TABLE trade_logs (
+                    CREATE TABLE IF NOT EXISTS trade_logs (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
                         symbol TEXT NOT NULL,              -- e.g., 'TSKB', 'KONTR'
                         operation_type TEXT NOT NULL,      -- 'BUY' or 'SELL'
@@ -148,7 +606,7 @@ class PortfolioDatabase:
                 """)
             
             self.execute("""
-                    CREATE TABLE weekly_snapshots (
+                    CREATE TABLE IF NOT EXISTS weekly_snapshots (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
                         report_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         total_portfolio_value INTEGER,
@@ -163,10 +621,14 @@ class PortfolioDatabase:
                     );
                 """)
             
+            self._create_alerts_table()
+            self._create_change_log()
+            
             self.execute("""
-                    CREATE VIEW view_portfolio_summary AS
+                    CREATE VIEW IF NOT EXISTS view_portfolio_summary AS
                         SELECT 
                             symbol,
+                            currency,                   -- Amounts below are in this currency (see PortfolioValuation)
                             total_quantity,
                             
                             ROUND(average_cost / 1000000.0, 2) as average_cost,
@@ -189,11 +651,11 @@ class PortfolioDatabase:
                             
                         FROM portfolio_assets
                         WHERE total_quantity > 0
-                        ORDER BY market_value_tl DESC
+                        ORDER BY market_value DESC
                 """)
             
             self.execute("""
-                    CREATE VIEW view_weekly_report AS
+                    CREATE VIEW IF NOT EXISTS view_weekly_report AS
                         SELECT 
                             id,
                             date(report_date) as Tarih,
@@ -213,6 +675,92 @@ class PortfolioDatabase:
             logger.error(f"Sqlite Schema Initialization Error: {e}")
             raise
 
+    def _create_alerts_table(self):
+        
+        # TABLE: "Alerts" (one row per symbol/rule/day, re-evaluations are ignored)
+        self.execute("""
+                CREATE TABLE IF NOT EXISTS alerts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    symbol TEXT NOT NULL,
+                    rule TEXT NOT NULL,                 -- 'STOP_LOSS', 'TARGET', 'STRATEGY_MOVE', 'MARKET_MOVE'
+                    event_date TEXT NOT NULL,           -- Format: 'YYYY-MM-DD'
+                    price INTEGER,                      -- Price that triggered the rule (scaled)
+                    change_pct REAL,                    -- Daily change (%) at trigger time
+                    message TEXT,
+                    acknowledged INTEGER DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE (symbol, rule, event_date)
+                );
+            """)
+
+    def _create_change_log(self):
+        
+        # TABLE: "Change Log" (filled by triggers, so every write path on portfolio_assets is covered)
+        self.execute("""
+                CREATE TABLE IF NOT EXISTS change_log (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,  -- Monotonic, never reused
+                    table_name TEXT NOT NULL,
+                    operation TEXT NOT NULL,                -- 'INSERT', 'UPDATE' or 'DELETE'
+                    row_key TEXT NOT NULL,                  -- JSON, e.g. {"symbol": "THYAO"}
+                    old_values TEXT,                        -- JSON, NULL for inserts
+                    new_values TEXT,                        -- JSON, NULL for deletes
+                    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+        
+        columns = ('strategy_mode', 'total_quantity', 'average_cost', 'current_price',
+                   'stop_loss', 'target_price', 'asset_type', 'currency')
+        
+        def as_json(prefix):
+            return "json_object(" + ", ".join(f"'{c}', {prefix}.{c}" for c in columns) + ")"
+        
+        changed = " OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in columns)
+        
+        self.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_portfolio_assets_insert AFTER INSERT ON portfolio_assets
+                BEGIN
+                    INSERT INTO change_log (table_name, operation, row_key, new_values)
+                    VALUES ('portfolio_assets', 'INSERT', json_object('symbol', NEW.symbol), {as_json('NEW')});
+                END;
+            """)
+        
+        # last_updated alone is not a change (price refresh with the same price)
+        self.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_portfolio_assets_update AFTER UPDATE ON portfolio_assets
+                WHEN {changed} OR OLD.symbol IS NOT NEW.symbol
+                BEGIN
+                    INSERT INTO change_log (table_name, operation, row_key, old_values, new_values)
+                    VALUES ('portfolio_assets', 'UPDATE', json_object('symbol', NEW.symbol), {as_json('OLD')}, {as_json('NEW')});
+                END;
+            """)
+        
+        self.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_portfolio_assets_delete AFTER DELETE ON portfolio_assets
+                BEGIN
+                    INSERT INTO change_log (table_name, operation, row_key, old_values)
+                    VALUES ('portfolio_assets', 'DELETE', json_object('symbol', OLD.symbol), {as_json('OLD')});
+                END;
+            """)
+
+    def _migrate_schema(self):
+        """Adds the tables/columns introduced after the first schema to older files."""
+        try:
+            self._create_alerts_table()
+            
+            columns = {row[1] for row in self.execute("PRAGMA table_info(portfolio_assets)").fetchall()}
+            if columns and 'currency' not in columns:
+                self.execute("ALTER TABLE portfolio_assets ADD COLUMN currency TEXT DEFAULT 'TRY'")
+                logger.info("Sqlite Schema migrated: portfolio_assets.currency added.")
+            
+            # Triggers reference portfolio_assets.currency, so they come after the column
+            self._create_change_log()
+            
+            self._conn.commit()
+            
+        except Exception as e:
+            logger.error(f"Sqlite Schema Migration Error: {e}")
+            raise
+
     def close(self):
         
         if self._conn:
@@ -232,8 +780,120 @@ class PortfolioDatabase:
             self._connect()
         return self._conn.cursor()
     
+    def execute(self, sql: str, params: tuple = ()):
+        return self._get_connection().execute(sql, params)
+
+    def changes_since(self, seq: int = 0, table_name: Optional[str] = None, limit: Optional[int] = None) -> pd.DataFrame:
+        """Change log entries with seq > 'seq', oldest first (see MarketDatabase.changes_since)."""
+        sql = "SELECT * FROM change_log WHERE seq > ?"
+        params = [int(seq)]
+        if table_name is not None:
+            sql += " AND table_name = ?"
+            params.append(table_name)
+        sql += " ORDER BY seq"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return pd.read_sql_query(sql, self._get_connection(), params=params)
+
+    def latest_change_seq(self) -> int:
+        return self.execute("SELECT COALESCE(max(seq), 0) FROM change_log").fetchone()[0]
+
     def to_int(self, value: float) -> int:
         return int(round(value * 1_000_000))
 
     def to_float(self, value: int) -> float:
-        return value / 1_000_000.0
\ No newline at end of file
+        return value / 1_000_000.0
+# --- BENCHMARK ---
+if __name__ == "__main__":
+    # python -m pyfolio_core.core.database [legacy.duckdb]
+    # Compares file size and read time of the legacy daily_prices table with the
+    # symbol dictionary layout (with and without a PRIMARY KEY), read through the
+    # view and directly. The given file is never modified; without one, a synthetic
+    # 1000 symbols x 2500 days legacy file is generated.
+    import sys
+    import time
+    import shutil
+    import tempfile
+
+    work_dir = tempfile.mkdtemp()
+    legacy_path = os.path.join(work_dir, "legacy.duckdb")
+
+    if len(sys.argv) > 1:
+        shutil.copy(sys.argv[1], legacy_path)
+    else:
+        conn = duckdb.connect(legacy_path)
+        conn.execute("""
+            CREATE TABLE daily_prices (
+                symbol VARCHAR, event_date DATE, open BIGINT, high BIGINT, low BIGINT,
+                close BIGINT, volume DOUBLE, PRIMARY KEY (symbol, event_date)
+            );
+        """)
+        conn.execute("""
+            INSERT INTO daily_prices
+            SELECT 'SYM' || s, DATE '2015-01-01' + CAST(d AS INTEGER),
+                   c + 150000 * (CAST(hash(s, d, 1) % 11 AS BIGINT) - 5), c + 150000 * CAST(hash(s, d, 2) % 9 AS BIGINT),
+                   c - 150000 * CAST(hash(s, d, 3) % 9 AS BIGINT), c, CAST(hash(s, d) % 5000000 AS DOUBLE)
+            FROM (SELECT s, d, 5000000 + 100000 * s + 2000 * d AS c FROM range(1000) t(s), range(2500) u(d))
+        """)
+        conn.close()
+
+    def fresh_copy(path: str) -> str:
+        """COPY FROM DATABASE into a new file, so sizes exclude freed blocks."""
+        target = path.replace(".duckdb", "_copy.duckdb")
+        conn = duckdb.connect()
+        conn.execute(f"ATTACH '{path}' AS src (READ_ONLY)")
+        conn.execute(f"ATTACH '{target}' AS dst")
+        conn.execute("COPY FROM DATABASE src TO dst")
+        conn.close()
+        return target
+
+    def timed(path: str, sql: str) -> float:
+        """Best of 5 runs, in ms (result fetched as a DataFrame, like the readers do)."""
+        conn = duckdb.connect(path, read_only=True)
+        best = float('inf')
+        for _ in range(5):
+            started = time.perf_counter()
+            conn.execute(sql).df()
+            best = min(best, time.perf_counter() - started)
+        conn.close()
+        return best * 1000
+
+    before = fresh_copy(legacy_path)
+
+    compact_path = os.path.join(work_dir, "compact.duckdb")
+    shutil.copy(legacy_path, compact_path)
+    MarketDatabase(compact_path).close()   # migrates on connect
+    after = fresh_copy(compact_path)
+
+    # Same rows with PRIMARY KEY (symbol_id, event_date): the cost of the key on its own
+    keyed_path = os.path.join(work_dir, "compact_keyed.duckdb")
+    shutil.copy(after, keyed_path)
+    conn = duckdb.connect(keyed_path)
+    conn.execute("ALTER TABLE daily_prices_compact RENAME TO daily_prices_plain")
+    conn.execute(MarketDatabase.DAILY_PRICES_COMPACT_DDL.replace(
+        "volume DOUBLE", "volume DOUBLE, PRIMARY KEY (symbol_id, event_date)"))
+    conn.execute("INSERT INTO daily_prices_compact SELECT * FROM daily_prices_plain ORDER BY symbol_id, event_date")
+    conn.execute("DROP TABLE daily_prices_plain")
+    conn.close()
+    keyed = fresh_copy(keyed_path)
+
+    ohlcv = "count(*), sum(open), sum(high), sum(low), sum(close), sum(volume)"
+    # Hot reader shapes: per-symbol close export (PriceCache) and latest close per symbol (valuation)
+    export = "SELECT {key}, event_date, close FROM {table} ORDER BY {key}, event_date"
+    latest = "SELECT {key}, arg_max(close, event_date), max(event_date) FROM {table} GROUP BY {key}"
+
+    rows = duckdb.connect(before, read_only=True).execute("SELECT count(*) FROM daily_prices").fetchone()[0]
+    print(f"rows: {rows}")
+    print(f"{'':34}{'size MiB':>9}{'scan ms':>9}{'export ms':>10}{'latest ms':>10}")
+    for label, path, table, key in (
+        ("legacy daily_prices", before, "daily_prices", "symbol"),
+        ("compact + PK (symbol_id, date)", keyed, "daily_prices_compact", "symbol_id"),
+        ("compact via daily_prices view", after, "daily_prices", "symbol"),
+        ("daily_prices_compact (symbol_id)", after, "daily_prices_compact", "symbol_id"),
+    ):
+        print(f"{label:34}{os.path.getsize(path) / 2**20:9.1f}"
+              f"{timed(path, f'SELECT {ohlcv} FROM {table}'):9.1f}"
+              f"{timed(path, export.format(key=key, table=table)):10.1f}"
+              f"{timed(path, latest.format(key=key, table=table)):10.1f}")
+    shutil.rmtree(work_dir, ignore_errors=True)
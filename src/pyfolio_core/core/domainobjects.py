@@ -1,5 +1,9 @@
 from dataclasses import dataclass
 from datetime import datetime, date
+from typing import Iterable
+import pandas as pd
+
+from pyfolio_core.core.constants import SCALING_FACTOR
 
 @dataclass(slots=True)
 class StockValue:
@@ -20,8 +24,9 @@ class StockValue:
         """
         Factory Method: Creates an object from the Pandas line. 
         """
-        # Convert Pandas Timestamp to Python date
-        py_date = df_row['datetime'].date() 
+        # Convert Pandas Timestamp to Python date (tvDatafeed indexes bars by datetime)
+        stamp = df_row['datetime'] if 'datetime' in df_row.index else df_row.name
+        py_date = stamp.date()
         
         return cls(
             symbol=symbol,
@@ -44,3 +49,12 @@ class StockValue:
             self.close, 
             self.volume
         )
+
+    @staticmethod
+    def to_frame(values: Iterable['StockValue']) -> pd.DataFrame:
+        """Batch of values -> 'daily_prices' layout (prices as scaled integers)."""
+        df = pd.DataFrame([v.to_tuple() for v in values],
+                          columns=['symbol', 'event_date', 'open', 'high', 'low', 'close', 'volume'])
+        for col in ('open', 'high', 'low', 'close'):
+            df[col] = (df[col] * SCALING_FACTOR).round().astype('Int64')
+        return df
@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import Optional
 
 class Exchange(Enum):
     """
@@ -17,3 +18,47 @@ class Exchange(Enum):
     @classmethod
     def list_all(cls):
         return [e.value for e in cls]
+
+    @property
+    def currency(self) -> Optional['Currency']:
+        """Quote currency of the instruments listed on the exchange (None: not a single Currency)."""
+        return _EXCHANGE_CURRENCY.get(self)
+
+class Currency(Enum):
+    """
+    ISO 4217 codes used for valuation.
+    FX pairs are written as <BASE><QUOTE> (e.g. USDTRY) as in FX_IDC.
+    """
+    TRY = "TRY"
+    USD = "USD"
+    EUR = "EUR"
+    GBP = "GBP"
+
+    @classmethod
+    def list_all(cls):
+        return [e.value for e in cls]
+
+# Exchanges without a single quote currency are left out (currency -> None):
+# LSE quotes in GBX (pence, 1/100 GBP), BINANCE in the quote asset of each pair
+# (USDT, BTC, ...), FX_IDC in the quote currency of each pair.
+_EXCHANGE_CURRENCY = {
+    Exchange.BIST: Currency.TRY,
+    Exchange.NASDAQ: Currency.USD,
+    Exchange.NYSE: Currency.USD,
+    Exchange.AMEX: Currency.USD,
+    Exchange.XETRA: Currency.EUR,
+}
+
+
+class QuarantineReason(Enum):
+    """
+    Reason codes of rows rejected by the ingest validation (see PriceValidator).
+    Declaration order is the precedence when a row breaks several rules.
+    """
+    MISSING_VALUE = "MISSING_VALUE"         # NaN / empty OHLC or date
+    NON_POSITIVE_PRICE = "NON_POSITIVE_PRICE"
+    NEGATIVE_VOLUME = "NEGATIVE_VOLUME"
+    INVALID_RANGE = "INVALID_RANGE"         # high < low, open/close outside [low, high]
+    PRICE_JUMP = "PRICE_JUMP"               # close vs previous close beyond MAX_PRICE_JUMP_RATIO
+    STALE_DUPLICATE = "STALE_DUPLICATE"     # same OHLCV as the previous bar on a new date
+    DUPLICATE_ROW = "DUPLICATE_ROW"         # same (symbol, event_date) twice in one batch
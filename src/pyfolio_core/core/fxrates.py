@@ -0,0 +1,127 @@
+import logging
+from typing import Dict, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from pyfolio_core.core.database import MarketDatabase
+from pyfolio_core.core.enums import Currency
+from pyfolio_core.core.constants import SCALING_FACTOR, PIVOT_CURRENCY
+
+logger = logging.getLogger("PyFolio-Core")
+
+CurrencyLike = Union[Currency, str]
+
+def _code(currency: CurrencyLike) -> str:
+    return currency.value if isinstance(currency, Currency) else str(currency).upper()
+
+def _to_days(dates) -> np.ndarray:
+    """Dates (scalar, list, Series, ndarray) -> int64 days since epoch."""
+    if isinstance(dates, (np.ndarray, pd.Series)) and dates.dtype.kind == 'M':
+        return np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+    stamps = pd.to_datetime(np.atleast_1d(np.asarray(dates, dtype=object)))
+    return np.asarray(stamps.values, dtype='datetime64[D]').astype(np.int64)
+
+class FxRateCache:
+    """
+    In-memory as-of lookup over the 'fx_rates' table.
+
+    Every pair is held as two sorted arrays (event days, rates) and resolved
+    with a binary search, so converting N rows costs one searchsorted call
+    per currency instead of N queries. Missing pairs are derived from the
+    inverse pair or crossed through PIVOT_CURRENCY (EURUSD = EURTRY / USDTRY).
+    """
+
+    def __init__(self, market_db: MarketDatabase, pivot: CurrencyLike = PIVOT_CURRENCY):
+
+        self.market_db = market_db
+        self.pivot = _code(pivot)
+        self._series: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]] = {}
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Reloads every pair from DuckDB. Call after an FX sync."""
+        conn = self.market_db._get_connection()
+        df = conn.execute("""
+            SELECT base_currency, quote_currency, event_date, rate
+            FROM fx_rates
+            ORDER BY base_currency, quote_currency, event_date
+        """).df()
+
+        series = {}
+        for (base, quote), group in df.groupby(['base_currency', 'quote_currency'], sort=False):
+            days = _to_days(group['event_date'].values)
+            rates = group['rate'].to_numpy(dtype=np.float64) / SCALING_FACTOR
+            series[(base, quote)] = (days, rates)
+
+        self._series = series
+        logger.info(f"FX cache loaded: {len(series)} pairs, {len(df)} rates.")
+
+    @property
+    def pairs(self) -> list:
+        return [f"{base}{quote}" for base, quote in self._series]
+
+    def _lookup(self, base: str, quote: str, days: np.ndarray) -> np.ndarray:
+        """
+        Direct or inverse pair. Dates before the first observation -> NaN:
+        the rate is unknown there and needs an FX backfill, not a guess.
+        """
+        if (base, quote) in self._series:
+            key_days, rates = self._series[(base, quote)]
+            invert = False
+        elif (quote, base) in self._series:
+            key_days, rates = self._series[(quote, base)]
+            invert = True
+        else:
+            return None
+
+        idx = np.searchsorted(key_days, days, side='right') - 1
+        out = rates[np.clip(idx, 0, None)]
+        out = np.where(idx < 0, np.nan, out)
+        return 1.0 / out if invert else out
+
+    def rates_at(self, base: CurrencyLike, quote: CurrencyLike, dates) -> np.ndarray:
+        """
+        Vectorized as-of rate: price of 1 'base' in 'quote' on each date,
+        using the latest rate published on or before that date.
+        """
+        return self._rates_for_days(_code(base), _code(quote), _to_days(dates))
+
+    def _rates_for_days(self, base: str, quote: str, days: np.ndarray) -> np.ndarray:
+
+        if base == quote:
+            return np.ones(len(days), dtype=np.float64)
+
+        rates = self._lookup(base, quote, days)
+        if rates is not None:
+            return rates
+
+        if self.pivot not in (base, quote):
+            to_pivot = self._lookup(base, self.pivot, days)
+            from_pivot = self._lookup(self.pivot, quote, days)
+            if to_pivot is not None and from_pivot is not None:
+                return to_pivot * from_pivot
+
+        raise KeyError(f"No FX rate available for {base}{quote}.")
+
+    def rate_at(self, base: CurrencyLike, quote: CurrencyLike, on_date) -> float:
+        return float(self.rates_at(base, quote, [on_date])[0])
+
+    def convert(self, amounts, currencies, dates, target: CurrencyLike) -> np.ndarray:
+        """
+        Converts 'amounts' quoted in 'currencies' into 'target' at 'dates'.
+        All three are row-aligned; 'dates' may also be a single date.
+        Rows dated before the FX history of their pair are NaN.
+        """
+        amounts = np.asarray(amounts, dtype=np.float64)
+        currencies = np.asarray(currencies, dtype=object)
+        target = _code(target)
+        days = _to_days(dates)
+        if len(days) == 1 and len(amounts) != 1:
+            days = np.repeat(days, len(amounts))
+
+        out = np.empty(len(amounts), dtype=np.float64)
+        for currency in pd.unique(currencies):
+            mask = currencies == currency
+            out[mask] = amounts[mask] * self._rates_for_days(_code(currency), target, days[mask])
+        return out
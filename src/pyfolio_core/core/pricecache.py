@@ -0,0 +1,205 @@
+import os
+import json
+import shutil
+import logging
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from pyfolio_core.core.database import MarketDatabase
+
+logger = logging.getLogger("PyFolio-Core")
+
+_INDEX_FILE = "index.json"
+_DATES_FILE = "dates.npy"
+_CLOSE_FILE = "close.npy"
+
+class PriceCache:
+    """
+    Read-optimized, memory-mapped copy of 'daily_prices' closes.
+
+    One directory per partition (usually the exchange code):
+        dates.npy  -> datetime64[D]
+        close.npy  -> int64 scaled close (same integers as DuckDB)
+        index.json -> {symbol: [offset, length]}, last cached event_date
+    Every symbol occupies a contiguous, date-ordered block, so reading a series
+    is a zero-copy slice of the mapped arrays instead of a SQL round trip.
+    """
+
+    def __init__(self, market_db: MarketDatabase, cache_dir: str = "data/price_cache"):
+
+        self.market_db = market_db
+        self.cache_dir = cache_dir
+        self._maps: Dict[str, Tuple[dict, np.ndarray, np.ndarray]] = {}
+
+    def _partition_dir(self, partition: str) -> str:
+        return os.path.join(self.cache_dir, partition.upper())
+
+    def _query(self, symbols: Optional[Iterable[str]], since: Optional[date]) -> pd.DataFrame:
+        """(symbol, event_date, close) blocks ordered by symbol_id; names are resolved after the scan."""
+        sql = "SELECT symbol_id, event_date, close FROM daily_prices_compact WHERE 1=1"
+        params = []
+        if symbols is not None:
+            sql += " AND symbol_id IN (SELECT symbol_id FROM symbols WHERE list_contains(?, symbol))"
+            params.append(list(symbols))
+        if since is not None:
+            sql += " AND event_date >= ?"
+            params.append(since)
+        sql += " ORDER BY symbol_id, event_date"
+
+        df = self.market_db._get_connection().execute(sql, params).df()
+        df.insert(0, 'symbol', self.market_db.symbol_map().reindex(df.pop('symbol_id')).to_numpy())
+        return df
+
+    def _write(self, partition: str, symbols: np.ndarray, days: np.ndarray, closes: np.ndarray,
+               symbol_list: Optional[list]) -> None:
+        """Writes a full partition next to the old one and swaps it in atomically."""
+        target = self._partition_dir(partition)
+        staging = target + ".tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+        np.save(os.path.join(staging, _DATES_FILE), days.astype(np.int64).view('datetime64[D]'))
+        np.save(os.path.join(staging, _CLOSE_FILE), closes.astype(np.int64))
+
+        # symbols are block-contiguous: block starts are where the value changes
+        starts = np.flatnonzero(np.r_[True, symbols[1:] != symbols[:-1]]) if len(symbols) else np.array([], dtype=np.int64)
+        lengths = np.diff(np.r_[starts, len(symbols)])
+        index = {
+            'last_date': str(np.datetime64(int(days.max()), 'D')) if len(days) else None,
+            'symbol_filter': symbol_list,
+            'symbols': {str(symbols[s]): [int(s), int(n)] for s, n in zip(starts, lengths)},
+        }
+        with open(os.path.join(staging, _INDEX_FILE), 'w') as f:
+            json.dump(index, f)
+
+        backup = target + ".old"
+        shutil.rmtree(backup, ignore_errors=True)
+        if os.path.exists(target):
+            os.replace(target, backup)
+        os.replace(staging, target)
+        shutil.rmtree(backup, ignore_errors=True)
+
+        self._maps.pop(partition.upper(), None)
+
+    def build(self, partition: str, symbols: Optional[Iterable[str]] = None) -> int:
+        """Full export of the partition from DuckDB. Returns the number of rows cached."""
+        symbol_list = sorted({str(s) for s in symbols}) if symbols is not None else None
+        df = self._query(symbol_list, None)
+
+        days = np.asarray(df['event_date'].values, dtype='datetime64[D]').astype(np.int64)
+        self._write(partition, df['symbol'].to_numpy(dtype=object), days,
+                    df['close'].to_numpy(dtype=np.int64), symbol_list)
+
+        logger.info(f"Price cache built: {partition.upper()} ({len(df)} rows).")
+        return len(df)
+
+    def invalidate(self, partition: str) -> None:
+
+        self._maps.pop(partition.upper(), None)
+        shutil.rmtree(self._partition_dir(partition), ignore_errors=True)
+        logger.info(f"Price cache invalidated: {partition.upper()}.")
+
+    def sync(self, partition: str, symbols: Optional[Iterable[str]] = None) -> int:
+        """
+        Incremental refresh after a daily sync: only rows dated on or after the
+        last cached day are read from DuckDB. Bars of that day are overwritten
+        in place (re-synced closes), newer bars are inserted at the end of each
+        symbol block. Corrections to older history need build().
+        """
+        if not os.path.exists(os.path.join(self._partition_dir(partition), _INDEX_FILE)):
+            return self.build(partition, symbols)
+
+        index, dates, closes = self._load(partition)
+        days = dates.view(np.int64)
+        if index['last_date'] is None:
+            return self.build(partition, symbols)
+
+        symbol_list = index['symbol_filter']
+        if symbols is not None and symbol_list is not None:
+            symbol_list = sorted(set(symbol_list) | {str(s) for s in symbols})
+        delta = self._query(symbol_list, date.fromisoformat(index['last_date']))
+        if delta.empty:
+            return 0
+
+        blocks = index['symbols']
+        offsets = np.array([blocks.get(s, (-1, 0))[0] for s in delta['symbol']], dtype=np.int64)
+        lengths = np.array([blocks.get(s, (-1, 0))[1] for s in delta['symbol']], dtype=np.int64)
+        delta_days = np.asarray(delta['event_date'].values, dtype='datetime64[D]').astype(np.int64)
+        delta_close = delta['close'].to_numpy(dtype=np.int64)
+
+        # Same-day bars: replace the tail element of the symbol block
+        tail = offsets + lengths - 1
+        known = offsets >= 0
+        same_day = known & (lengths > 0) & (days[np.clip(tail, 0, None)] == delta_days)
+
+        new_days = np.array(days, dtype=np.int64)
+        new_close = np.array(closes, dtype=np.int64)
+        new_close[tail[same_day]] = delta_close[same_day]
+
+        append = ~same_day
+        if not append.any():
+            self._write_in_place(partition, new_close)
+            logger.info(f"Price cache synced: {partition.upper()} ({same_day.sum()} updated, 0 appended).")
+            return int(same_day.sum())
+
+        # np.insert keeps the block layout: new bars of known symbols go to the
+        # block end, unseen symbols get new blocks at the end of the file.
+        insert_at = np.where(known[append], offsets[append] + lengths[append], len(new_days))
+        new_symbols = np.empty(len(new_days), dtype=object)
+        for symbol, (offset, length) in blocks.items():
+            new_symbols[offset:offset + length] = symbol
+
+        new_symbols = np.insert(new_symbols, insert_at, delta['symbol'].to_numpy(dtype=object)[append])
+        new_days = np.insert(new_days, insert_at, delta_days[append])
+        new_close = np.insert(new_close, insert_at, delta_close[append])
+
+        self._write(partition, new_symbols, new_days, new_close, symbol_list)
+        logger.info(f"Price cache synced: {partition.upper()} ({same_day.sum()} updated, {append.sum()} appended).")
+        return len(delta)
+
+    def _write_in_place(self, partition: str, closes: np.ndarray) -> None:
+
+        self._maps.pop(partition.upper(), None)
+        mapped = np.load(os.path.join(self._partition_dir(partition), _CLOSE_FILE), mmap_mode='r+')
+        mapped[:] = closes
+        mapped.flush()
+        del mapped
+
+    def _load(self, partition: str) -> Tuple[dict, np.ndarray, np.ndarray]:
+
+        key = partition.upper()
+        if key not in self._maps:
+            path = self._partition_dir(partition)
+            with open(os.path.join(path, _INDEX_FILE)) as f:
+                index = json.load(f)
+            days = np.load(os.path.join(path, _DATES_FILE), mmap_mode='r')
+            closes = np.load(os.path.join(path, _CLOSE_FILE), mmap_mode='r')
+            self._maps[key] = (index, days, closes)
+        return self._maps[key]
+
+    def symbols(self, partition: str) -> list:
+        return list(self._load(partition)[0]['symbols'])
+
+    def get_series(self, partition: str, symbol: str,
+                   start: Optional[date] = None, end: Optional[date] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Zero-copy (dates, close) views for one symbol.
+        dates are datetime64[D], close is the scaled int64 value.
+        """
+        index, dates, closes = self._load(partition)
+        block = index['symbols'].get(symbol)
+        if block is None:
+            raise KeyError(f"{symbol} is not cached in partition {partition.upper()}.")
+
+        offset, length = block
+        block_dates = dates[offset:offset + length]
+        lo, hi = 0, length
+        if start is not None:
+            lo = int(np.searchsorted(block_dates, np.datetime64(start, 'D'), side='left'))
+        if end is not None:
+            hi = int(np.searchsorted(block_dates, np.datetime64(end, 'D'), side='right'))
+
+        return block_dates[lo:hi], closes[offset + lo:offset + hi]
@@ -0,0 +1,202 @@
+import logging
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from pyfolio_core.core.database import MarketDatabase
+from pyfolio_core.core.enums import QuarantineReason
+from pyfolio_core.core.constants import MAX_PRICE_JUMP_RATIO, VALIDATION_LOOKBACK_DAYS
+
+logger = logging.getLogger("PyFolio-Core")
+
+PRICE_COLUMNS = ['symbol', 'event_date', 'open', 'high', 'low', 'close', 'volume']
+
+class PriceValidator:
+    """
+    Ingest stage between the feeds and 'daily_prices'.
+
+    A batch (PRICE_COLUMNS, scaled integer prices) is checked with vectorized
+    rules against the previous bar of every symbol: the previous row of the
+    same batch, or the latest stored bar before the row's date (one ASOF join).
+    Valid rows are upserted in bulk, rejected rows go to 'quarantine_prices'
+    with a QuarantineReason code.
+    """
+
+    def __init__(self, market_db: MarketDatabase, max_jump_ratio: float = MAX_PRICE_JUMP_RATIO,
+                 lookback_days: int = VALIDATION_LOOKBACK_DAYS):
+
+        self.market_db = market_db
+        self.max_jump_ratio = max_jump_ratio
+        self.lookback_days = lookback_days
+
+    def _previous_bars(self, batch: pd.DataFrame) -> pd.DataFrame:
+        """
+        Latest stored bar strictly before each batch row (aligned with batch.index).
+        Only the last VALIDATION_LOOKBACK_DAYS before the batch are searched, so
+        the join touches a few days of 'daily_prices_compact' instead of its full history.
+        """
+        conn = self.market_db._get_connection()
+        keys = pd.DataFrame({
+            'row_id': np.arange(len(batch)),
+            'symbol': batch['symbol'].to_numpy(),
+            'event_date': batch['event_date'].dt.date.to_numpy(),
+        })
+        first_day = batch['event_date'].min().date()
+        last_day = batch['event_date'].max().date()
+
+        conn.register('validation_keys', keys)
+        try:
+            # New symbols have no symbol_id yet and simply find no stored bar
+            prev = conn.execute("""
+                SELECT k.row_id, b.open, b.high, b.low, b.close, b.volume
+                FROM (
+                    SELECT v.row_id, v.event_date, s.symbol_id
+                    FROM validation_keys v
+                    LEFT JOIN symbols s USING (symbol)
+                ) k
+                ASOF LEFT JOIN (
+                    SELECT p.symbol_id, p.event_date, p.open, p.high, p.low, p.close, p.volume
+                    FROM daily_prices_compact p
+                    WHERE p.event_date >= CAST(? AS DATE) - INTERVAL (?) DAY
+                      AND p.event_date < CAST(? AS DATE)
+                ) b
+                    ON k.symbol_id = b.symbol_id AND k.event_date > b.event_date
+                ORDER BY k.row_id
+            """, (first_day, self.lookback_days, last_day)).df()
+        finally:
+            conn.unregister('validation_keys')
+        prev.index = batch.index
+        return prev.drop(columns='row_id')
+
+    def _reference_reason(self, bar: np.ndarray, prev: np.ndarray, local_reason: np.ndarray) -> np.ndarray:
+        """Row-local reason, else PRICE_JUMP / STALE_DUPLICATE against 'prev' ('' = valid)."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = bar[:, 3] / prev[:, 3]
+        checks = (
+            (local_reason != '', local_reason),
+            ((ratio > self.max_jump_ratio) | (ratio < 1.0 / self.max_jump_ratio), QuarantineReason.PRICE_JUMP.value),
+            ((bar == prev).all(axis=1), QuarantineReason.STALE_DUPLICATE.value),
+        )
+        # First matching rule wins (np.select keeps the precedence order)
+        return np.select([m for m, _ in checks], [r for _, r in checks], default='').astype(object)
+
+    def validate(self, batch: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Returns (valid, rejected). 'rejected' carries 'prev_close' and 'reason'.
+        Rows of one symbol are checked against each other in date order; a
+        rejected row is never used as the reference of the next one.
+        """
+        if batch.empty:
+            return batch, batch.assign(prev_close=pd.Series(dtype='Int64'), reason=pd.Series(dtype=object))
+
+        batch = batch[PRICE_COLUMNS].copy()
+        batch['event_date'] = pd.to_datetime(batch['event_date']).dt.normalize()
+        batch = batch.sort_values(['symbol', 'event_date'], kind='stable', ignore_index=True)
+
+        # keep='last': a later row of the same key overrides the earlier one
+        duplicated = batch.duplicated(['symbol', 'event_date'], keep='last')
+        duplicates = batch[duplicated].assign(prev_close=pd.NA, reason=QuarantineReason.DUPLICATE_ROW.value)
+        batch = batch[~duplicated].reset_index(drop=True)
+
+        o, h, l, c = (batch[col].to_numpy(dtype=np.float64, na_value=np.nan) for col in ('open', 'high', 'low', 'close'))
+        v = batch['volume'].to_numpy(dtype=np.float64, na_value=np.nan)
+        bar = np.column_stack((o, h, l, c, v))
+
+        # Row-local rules (no reference needed), in precedence order
+        local_checks = (
+            (QuarantineReason.MISSING_VALUE, np.isnan(bar[:, :4]).any(axis=1)
+             | batch['event_date'].isna().to_numpy() | batch['symbol'].isna().to_numpy()),
+            (QuarantineReason.NON_POSITIVE_PRICE, (bar[:, :4] <= 0).any(axis=1)),
+            (QuarantineReason.NEGATIVE_VOLUME, v < 0),
+            (QuarantineReason.INVALID_RANGE, (h < l) | (o > h) | (o < l) | (c > h) | (c < l)),
+        )
+        local_reason = np.select([m for _, m in local_checks], [r.value for r, _ in local_checks], default='')
+
+        stored = self._previous_bars(batch)[['open', 'high', 'low', 'close', 'volume']] \
+            .to_numpy(dtype=np.float64, na_value=np.nan)
+        symbol_codes = pd.factorize(batch['symbol'])[0]
+
+        # Pass 1 (vectorized): reference = previous row-locally valid row of the
+        # same symbol, else the stored bar. Rows are symbol-sorted, so the running
+        # max of valid row numbers is the last valid row.
+        row = np.arange(len(batch))
+        last_ok = np.maximum.accumulate(np.r_[-1, np.where(local_reason == '', row, -1)[:-1]])
+        has_batch_ref = (last_ok >= 0) & (symbol_codes[np.clip(last_ok, 0, None)] == symbol_codes)
+        prev = stored.copy()
+        prev[has_batch_ref] = bar[last_ok[has_batch_ref]]
+        reason = self._reference_reason(bar, prev, local_reason)
+
+        # Pass 2 (sequential, only symbols with a rejected reference check): a rejected
+        # row must not become the reference of its successor, so walk those symbols in
+        # date order and carry the last accepted bar.
+        for code in np.unique(symbol_codes[(reason != local_reason)]):
+            reference = None
+            for i in np.flatnonzero(symbol_codes == code):
+                prev[i] = stored[i] if reference is None else reference
+                reason[i] = self._reference_reason(bar[i:i + 1], prev[i:i + 1], local_reason[i:i + 1])[0]
+                if reason[i] == '':
+                    reference = bar[i]
+
+        bad = reason != ''
+        rejected = batch[bad].assign(prev_close=pd.array(prev[bad, 3], dtype='Int64'), reason=reason[bad])
+        if not duplicates.empty:
+            rejected = pd.concat([rejected, duplicates], ignore_index=True)
+        return batch[~bad], rejected
+
+    def ingest(self, batch: pd.DataFrame, source: str) -> int:
+        """Validates a batch, upserts the valid rows and quarantines the rest. Returns rows written."""
+        valid, rejected = self.validate(batch)
+        conn = self.market_db._get_connection()
+
+        if not valid.empty:
+            conn.register('ingest_batch', valid)
+            conn.execute("BEGIN TRANSACTION")
+            try:
+                # Change feed first: the join still sees the old values
+                conn.execute("""
+                    INSERT INTO change_log (table_name, operation, row_key, old_values, new_values)
+                    SELECT
+                        'daily_prices',
+                        CASE WHEN o.close IS NULL THEN 'INSERT' ELSE 'UPDATE' END,
+                        to_json({'symbol': b.symbol, 'event_date': CAST(b.event_date AS DATE)}),
+                        CASE WHEN o.close IS NOT NULL THEN
+                            to_json({'open': o.open, 'high': o.high, 'low': o.low, 'close': o.close, 'volume': o.volume})
+                        END,
+                        to_json({'open': b.open, 'high': b.high, 'low': b.low, 'close': b.close, 'volume': b.volume})
+                    FROM ingest_batch b
+                    LEFT JOIN (
+                        SELECT k.symbol, k.event_date, p.open, p.high, p.low, p.close, p.volume
+                        FROM ingest_batch k
+                        JOIN symbols s USING (symbol)
+                        JOIN daily_prices_compact p
+                            ON p.symbol_id = s.symbol_id AND p.event_date = CAST(k.event_date AS DATE)
+                    ) o
+                        ON o.symbol = b.symbol AND o.event_date = b.event_date
+                    WHERE o.close IS NULL
+                       OR (o.open, o.high, o.low, o.close, o.volume) IS DISTINCT FROM (b.open, b.high, b.low, b.close, b.volume)
+                    ORDER BY b.symbol, b.event_date
+                """)
+                self.market_db.upsert_daily_prices('ingest_batch', exchange=source)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.unregister('ingest_batch')
+
+        if not rejected.empty:
+            conn.register('quarantine_batch', rejected.assign(source=source))
+            try:
+                conn.execute("""
+                    INSERT INTO quarantine_prices (symbol, event_date, open, high, low, close, volume, prev_close, reason, source)
+                    SELECT symbol, CAST(event_date AS DATE), open, high, low, close, volume, prev_close, reason, source
+                    FROM quarantine_batch
+                """)
+            finally:
+                conn.unregister('quarantine_batch')
+
+            counts = rejected['reason'].value_counts().to_dict()
+            logger.warning(f"Quarantined {len(rejected)}/{len(batch)} rows from {source}: {counts}")
+
+        return len(valid)
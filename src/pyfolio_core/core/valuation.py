@@ -0,0 +1,142 @@
+import logging
+from datetime import date
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from pyfolio_core.core.database import MarketDatabase, PortfolioDatabase
+from pyfolio_core.core.enums import Currency
+from pyfolio_core.core.fxrates import FxRateCache, CurrencyLike, _code
+from pyfolio_core.core.constants import SCALING_FACTOR
+
+logger = logging.getLogger("PyFolio-Core")
+
+class PortfolioValuation:
+    """
+    Multi-currency portfolio valuation for any historical date.
+
+    Holdings are rebuilt from 'trade_logs' up to the valuation date, priced with
+    the last 'daily_prices' close on or before it and converted to the base
+    currency in one vectorized pass:
+        * market value -> FX rate of the valuation date
+        * invested     -> FX rate of each trade date
+    """
+
+    def __init__(self, pfolio_db: PortfolioDatabase, market_db: MarketDatabase,
+                 fx_cache: Optional[FxRateCache] = None):
+
+        self.pfolio_db = pfolio_db
+        self.market_db = market_db
+        self.fx_cache = fx_cache or FxRateCache(market_db)
+
+    def _load_trades(self, as_of: date) -> pd.DataFrame:
+
+        return pd.read_sql_query("""
+            SELECT t.symbol, t.operation_type, t.date, t.quantity, t.price, t.commission,
+                   COALESCE(a.currency, 'TRY') AS currency
+            FROM trade_logs t
+            LEFT JOIN portfolio_assets a ON a.symbol = t.symbol
+            WHERE t.date <= ?
+        """, self.pfolio_db._get_connection(), params=(as_of.isoformat(),))
+
+    def _load_closes(self, symbols: list, as_of: date) -> pd.DataFrame:
+
+        conn = self.market_db._get_connection()
+        return conn.execute("""
+            SELECT s.symbol, c.close, c.price_date
+            FROM (
+                SELECT symbol_id, arg_max(close, event_date) AS close, max(event_date) AS price_date
+                FROM daily_prices_compact
+                WHERE event_date <= ?
+                  AND symbol_id IN (SELECT symbol_id FROM symbols WHERE list_contains(?, symbol))
+                GROUP BY symbol_id
+            ) c
+            JOIN symbols s USING (symbol_id)
+        """, (as_of, symbols)).df()
+
+    def holdings_at(self, as_of: Optional[date] = None, base_currency: CurrencyLike = Currency.TRY) -> pd.DataFrame:
+        """
+        One row per open position, amounts in 'base_currency' (float, not scaled).
+        profit_loss = market_value - net invested (buys + commissions - sells).
+        Positions without a close have a NaN market_value; positions with a trade
+        or valuation date outside the FX history are flagged in 'missing_fx' and
+        have NaN amounts.
+        """
+        as_of = as_of or date.today()
+        base = _code(base_currency)
+
+        trades = self._load_trades(as_of)
+        if trades.empty:
+            return pd.DataFrame(columns=['symbol', 'currency', 'total_quantity', 'close', 'price_date',
+                                         'market_value', 'invested', 'profit_loss', 'profit_loss_pct', 'missing_fx'])
+
+        sign = np.where(trades['operation_type'].str.upper().to_numpy() == 'SELL', -1, 1)
+        quantity = trades['quantity'].to_numpy(dtype=np.int64)
+        cash_flow = (sign * quantity * trades['price'].to_numpy(dtype=np.float64)
+                     + trades['commission'].fillna(0).to_numpy(dtype=np.float64)) / SCALING_FACTOR
+
+        trades['signed_quantity'] = sign * quantity
+        trades['invested'] = self.fx_cache.convert(cash_flow, trades['currency'], trades['date'], base)
+        # groupby().sum() skips NaN, so missing trade-date rates are carried as a flag
+        trades['missing_fx'] = trades['invested'].isna()
+
+        positions = trades.groupby('symbol', as_index=False).agg(
+            currency=('currency', 'first'),
+            total_quantity=('signed_quantity', 'sum'),
+            invested=('invested', 'sum'),
+            missing_fx=('missing_fx', 'any'),
+        )
+        positions = positions[positions['total_quantity'] > 0]
+
+        closes = self._load_closes(positions['symbol'].tolist(), as_of)
+        positions = positions.merge(closes, on='symbol', how='left')
+
+        local_value = positions['total_quantity'].to_numpy(dtype=np.float64) \
+            * positions['close'].to_numpy(dtype=np.float64, na_value=np.nan) / SCALING_FACTOR
+        positions['close'] = positions['close'] / SCALING_FACTOR
+
+        unpriced = positions.loc[positions['close'].isna(), 'symbol'].tolist()
+        if unpriced:
+            logger.warning(f"No close on or before {as_of} for {len(unpriced)} position(s): {unpriced}. "
+                           f"Their market value is NaN.")
+
+        positions['market_value'] = self.fx_cache.convert(local_value, positions['currency'], as_of, base)
+        positions['missing_fx'] |= positions['market_value'].isna() & positions['close'].notna()
+        positions.loc[positions['missing_fx'], ['market_value', 'invested']] = np.nan
+
+        missing_fx = positions.loc[positions['missing_fx'], 'symbol'].tolist()
+        if missing_fx:
+            logger.warning(f"No FX rate for a trade or valuation date of {len(missing_fx)} position(s): "
+                           f"{missing_fx}. Backfill 'fx_rates' to value them.")
+
+        positions['profit_loss'] = positions['market_value'] - positions['invested']
+        positions['profit_loss_pct'] = np.where(
+            positions['invested'] > 0,
+            positions['profit_loss'] / positions['invested'] * 100,
+            0.0,
+        )
+
+        return positions.sort_values('market_value', ascending=False, ignore_index=True)
+
+    def total_value(self, as_of: Optional[date] = None, base_currency: CurrencyLike = Currency.TRY) -> dict:
+        """
+        Portfolio totals in 'base_currency' for the given date. Positions without
+        a close ('unpriced') or without an FX rate ('missing_fx') are left out of
+        every total and listed by symbol.
+        """
+        holdings = self.holdings_at(as_of, base_currency)
+        missing_fx = holdings['missing_fx'].astype(bool)
+        priced = holdings['market_value'].notna() & ~missing_fx
+        market_value = float(holdings.loc[priced, 'market_value'].sum())
+        invested = float(holdings.loc[priced, 'invested'].sum())
+
+        return {
+            'as_of': as_of or date.today(),
+            'base_currency': _code(base_currency),
+            'market_value': round(market_value, 2),
+            'invested': round(invested, 2),
+            'profit_loss': round(market_value - invested, 2),
+            'unpriced': holdings.loc[holdings['close'].isna(), 'symbol'].tolist(),
+            'missing_fx': holdings.loc[missing_fx, 'symbol'].tolist(),
+        }
@@ -0,0 +1,57 @@
+import pytest
+
+from pyfolio_core.core.alerts import AlertEngine
+
+from conftest import make_batch, scaled, write_prices
+
+
+@pytest.fixture
+def engine(market_db, pfolio_db):
+    # NASDAQ closes through Jan 2, BIST through Jan 3
+    write_prices(market_db, make_batch("AAPL", [100.0, 80.0]))
+    write_prices(market_db, make_batch("THYAO", [250.0, 251.0, 252.0]))
+    return AlertEngine(pfolio_db, market_db)
+
+
+def add_holding(pfolio_db, symbol, current_price, last_updated, stop_loss=0, target_price=0, mode='ATTACK'):
+    pfolio_db.execute("""
+        INSERT INTO portfolio_assets (symbol, strategy_mode, total_quantity, current_price,
+                                      stop_loss, target_price, last_updated)
+        VALUES (?, ?, 10, ?, ?, ?, ?)
+    """, (symbol, mode, scaled(current_price), scaled(stop_loss), scaled(target_price), last_updated))
+    pfolio_db._get_connection().commit()
+
+
+def rules(alerts):
+    return sorted(zip(alerts['symbol'], alerts['rule'], alerts['event_date']))
+
+
+def test_exchange_behind_the_newest_bar_is_still_fresh(engine, pfolio_db):
+    add_holding(pfolio_db, "AAPL", 100.0, "2024-01-01 18:00:00", stop_loss=85.0)
+
+    assert rules(engine.evaluate()) == [
+        ('AAPL', 'MARKET_MOVE', '2024-01-02'),
+        ('AAPL', 'STOP_LOSS', '2024-01-02'),
+        ('AAPL', 'STRATEGY_MOVE', '2024-01-02'),
+    ]
+
+
+def test_newer_portfolio_price_wins_over_last_bar(engine, pfolio_db):
+    add_holding(pfolio_db, "AAPL", 120.0, "2024-01-05 10:00:00", stop_loss=85.0, target_price=110.0)
+
+    alerts = engine.evaluate(symbols=[])
+    assert alerts['rule'].tolist() == ['TARGET']
+    assert alerts['price'].tolist() == [scaled(120.0)]
+
+
+def test_market_move_is_limited_to_synced_symbols(engine):
+    assert rules(engine.evaluate(symbols=["THYAO"])) == []
+    assert rules(engine.evaluate(symbols=["AAPL"])) == [('AAPL', 'MARKET_MOVE', '2024-01-02')]
+
+
+def test_run_stores_each_alert_once(engine, pfolio_db):
+    add_holding(pfolio_db, "AAPL", 100.0, "2024-01-01 18:00:00", stop_loss=85.0)
+
+    assert engine.run() == 3
+    assert engine.run() == 0
+    assert pfolio_db.execute("SELECT count(*) FROM alerts").fetchone()[0] == 3
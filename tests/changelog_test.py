@@ -0,0 +1,86 @@
+import json
+
+import pandas as pd
+
+from pyfolio_core.core.database import PortfolioDatabase
+from pyfolio_core.core.validation import PriceValidator
+
+from conftest import make_batch, scaled
+
+
+def test_portfolio_triggers_log_insert_update_delete(pfolio_db):
+    pfolio_db.execute("INSERT INTO portfolio_assets (symbol, total_quantity, current_price) VALUES ('THYAO', 10, ?)",
+                      (scaled(250.0),))
+    pfolio_db.execute("UPDATE portfolio_assets SET current_price = ? WHERE symbol = 'THYAO'", (scaled(260.0),))
+    pfolio_db.execute("DELETE FROM portfolio_assets WHERE symbol = 'THYAO'")
+    pfolio_db._conn.commit()
+
+    log = pfolio_db.changes_since(0, table_name='portfolio_assets')
+    assert log['operation'].tolist() == ['INSERT', 'UPDATE', 'DELETE']
+    assert {json.loads(k)['symbol'] for k in log['row_key']} == {'THYAO'}
+
+    insert, update, delete = log.itertuples()
+    assert pd.isna(insert.old_values)
+    assert json.loads(update.old_values)['current_price'] == scaled(250.0)
+    assert json.loads(update.new_values)['current_price'] == scaled(260.0)
+    assert json.loads(delete.old_values)['total_quantity'] == 10
+    assert pd.isna(delete.new_values)
+
+
+def test_last_updated_refresh_is_not_logged(pfolio_db):
+    pfolio_db.execute("INSERT INTO portfolio_assets (symbol, current_price) VALUES ('THYAO', ?)", (scaled(250.0),))
+    seq = pfolio_db.latest_change_seq()
+
+    # Same price re-written by a sync: only the timestamp moves
+    pfolio_db.execute("""
+        UPDATE portfolio_assets SET current_price = ?, last_updated = '2030-01-01 10:00:00'
+        WHERE symbol = 'THYAO'
+    """, (scaled(250.0),))
+    pfolio_db._conn.commit()
+
+    assert pfolio_db.changes_since(seq).empty
+    assert pfolio_db.latest_change_seq() == seq
+
+
+def test_portfolio_seq_continues_after_reopen(tmp_path):
+    path = str(tmp_path / "Portfolio.db")
+    db = PortfolioDatabase(path)
+    db.execute("INSERT INTO portfolio_assets (symbol) VALUES ('THYAO')")
+    db.execute("DELETE FROM portfolio_assets WHERE symbol = 'THYAO'")
+    db._conn.commit()
+    seq = db.latest_change_seq()
+    db.close()
+
+    db = PortfolioDatabase(path)
+    db.execute("INSERT INTO portfolio_assets (symbol) VALUES ('THYAO')")
+    db._conn.commit()
+    log = db.changes_since(seq)
+    db.close()
+
+    assert log['operation'].tolist() == ['INSERT']
+    assert log['seq'].iloc[0] > seq
+
+
+def test_market_change_log_follows_reingests(market_db):
+    validator = PriceValidator(market_db)
+    validator.ingest(make_batch("THYAO", [10.0, 10.1]), source="BIST")
+    first = market_db.changes_since(0, table_name='daily_prices')
+    assert first['operation'].tolist() == ['INSERT', 'INSERT']
+    assert first['old_values'].isna().all()
+
+    # Identical bars are not changes
+    seq = market_db.latest_change_seq()
+    validator.ingest(make_batch("THYAO", [10.0, 10.1]), source="BIST")
+    assert market_db.changes_since(seq).empty
+
+    # Corrected close for Jan 2 and a new bar for Jan 3
+    validator.ingest(make_batch("THYAO", [10.0, 10.2, 10.3]), source="BIST")
+    second = market_db.changes_since(seq)
+    assert second['operation'].tolist() == ['UPDATE', 'INSERT']
+    assert json.loads(second['old_values'].iloc[0])['close'] == scaled(10.1)
+    assert json.loads(second['new_values'].iloc[0])['close'] == scaled(10.2)
+
+    seqs = market_db.changes_since(0)['seq'].tolist()
+    assert seqs == sorted(seqs) and len(set(seqs)) == len(seqs)
+    assert min(second['seq']) > max(first['seq'])
+    assert market_db.changes_since(first['seq'].iloc[0], limit=1)['seq'].tolist() == [first['seq'].iloc[1]]
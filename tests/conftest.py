@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+from pyfolio_core.core.database import MarketDatabase, PortfolioDatabase
+from pyfolio_core.core.constants import SCALING_FACTOR
+
+
+@pytest.fixture
+def market_db(tmp_path):
+    db = MarketDatabase(str(tmp_path / "GlobalMarket.duckdb"))
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def pfolio_db(tmp_path):
+    db = PortfolioDatabase(str(tmp_path / "Portfolio.db"))
+    yield db
+    db.close()
+
+
+def scaled(value: float) -> int:
+    return int(round(value * SCALING_FACTOR))
+
+
+def make_batch(symbol, closes, start="2024-01-01"):
+    """Flat daily bars (open = high = low = close) in the 'daily_prices' layout."""
+    prices = [scaled(c) for c in closes]
+    return pd.DataFrame({
+        'symbol': symbol,
+        'event_date': pd.date_range(start, periods=len(prices), freq="D"),
+        'open': prices, 'high': prices, 'low': prices, 'close': prices,
+        'volume': [1000.0 + i for i in range(len(prices))],
+    })
+
+
+def write_prices(market_db, batch: pd.DataFrame) -> None:
+    """Upserts a batch without validation (fixtures with arbitrary prices)."""
+    conn = market_db._get_connection()
+    conn.register('fixture_batch', batch)
+    try:
+        market_db.upsert_daily_prices('fixture_batch')
+    finally:
+        conn.unregister('fixture_batch')
@@ -0,0 +1,166 @@
+import duckdb
+import pandas as pd
+import pytest
+
+from pyfolio_core.core.database import MarketDatabase
+from pyfolio_core.core.validation import PriceValidator
+
+from conftest import make_batch, scaled, write_prices
+
+# Opens far from close (beyond int32 at SCALING_FACTOR), a bar without OHLC legs, a penny stock
+LEGACY_ROWS = [
+    ("AAPL", "2024-01-02", scaled(185.5), scaled(188.4), scaled(183.9), scaled(185.6), 1000.0),
+    ("BRK.A", "2024-01-02", scaled(540000.0), scaled(546000.0), scaled(538000.0), scaled(544000.0), 7.0),
+    ("BRK.A", "2024-01-03", scaled(544000.0), scaled(544000.0), scaled(541000.0), scaled(541500.0), None),
+    ("TEFAS1", "2024-01-02", None, None, None, scaled(1.234567), None),
+    ("PENNY", "2024-01-02", 10, 12, 9, 11, 5.0e9),
+]
+
+PRICE_COLUMNS = ['symbol', 'event_date', 'open', 'high', 'low', 'close', 'volume']
+
+
+def read_view(db: MarketDatabase) -> pd.DataFrame:
+    return db._get_connection().execute(
+        "SELECT * FROM daily_prices ORDER BY symbol, event_date").df()
+
+
+def expected_frame() -> pd.DataFrame:
+    df = pd.DataFrame(LEGACY_ROWS, columns=PRICE_COLUMNS).sort_values(['symbol', 'event_date'], ignore_index=True)
+    df['event_date'] = pd.to_datetime(df['event_date'])
+    return df
+
+
+def assert_same_rows(actual: pd.DataFrame) -> None:
+    expected = expected_frame()
+    assert actual['symbol'].tolist() == expected['symbol'].tolist()
+    assert (actual['event_date'] == expected['event_date']).all()
+    for col in ('open', 'high', 'low', 'close', 'volume'):
+        assert actual[col].astype('Float64').equals(expected[col].astype('Float64')), col
+
+
+@pytest.fixture
+def legacy_path(tmp_path):
+    path = str(tmp_path / "GlobalMarket.duckdb")
+    conn = duckdb.connect(path)
+    conn.execute("""
+        CREATE TABLE daily_prices (
+            symbol VARCHAR, event_date DATE, open BIGINT, high BIGINT, low BIGINT,
+            close BIGINT, volume DOUBLE, PRIMARY KEY (symbol, event_date)
+        );
+    """)
+    conn.executemany("INSERT INTO daily_prices VALUES (?, ?, ?, ?, ?, ?, ?)", LEGACY_ROWS)
+    conn.execute("""
+        CREATE VIEW view_market_signals AS
+            SELECT symbol, event_date, close FROM daily_prices;
+    """)
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def delta_path(tmp_path):
+    """A file in the earlier int32 offset layout of daily_prices_compact."""
+    path = str(tmp_path / "GlobalMarket.duckdb")
+    conn = duckdb.connect(path)
+    conn.execute("CREATE SEQUENCE symbol_id_seq START 1;")
+    conn.execute("""
+        CREATE TABLE symbols (
+            symbol_id INTEGER PRIMARY KEY DEFAULT nextval('symbol_id_seq'),
+            symbol VARCHAR UNIQUE NOT NULL
+        );
+    """)
+    conn.execute("""
+        CREATE TABLE daily_prices_compact (
+            symbol_id INTEGER, event_date DATE, close BIGINT,
+            open_delta INTEGER, high_delta INTEGER, low_delta INTEGER, volume DOUBLE,
+            open_full BIGINT, high_full BIGINT, low_full BIGINT
+        );
+    """)
+    conn.execute("CREATE TEMP TABLE legacy (symbol VARCHAR, event_date DATE, open BIGINT, high BIGINT, "
+                 "low BIGINT, close BIGINT, volume DOUBLE)")
+    conn.executemany("INSERT INTO legacy VALUES (?, ?, ?, ?, ?, ?, ?)", LEGACY_ROWS)
+    conn.execute("INSERT INTO symbols (symbol) SELECT DISTINCT symbol FROM legacy ORDER BY symbol")
+    fits = "BETWEEN -2147483648 AND 2147483647"
+    conn.execute(f"""
+        INSERT INTO daily_prices_compact
+        SELECT s.symbol_id, b.event_date, b.close,
+            CASE WHEN b.open - b.close {fits} THEN CAST(b.open - b.close AS INTEGER) END,
+            CASE WHEN b.high - b.close {fits} THEN CAST(b.high - b.close AS INTEGER) END,
+            CASE WHEN b.low - b.close {fits} THEN CAST(b.low - b.close AS INTEGER) END,
+            b.volume,
+            CASE WHEN b.open - b.close NOT {fits} THEN b.open END,
+            CASE WHEN b.high - b.close NOT {fits} THEN b.high END,
+            CASE WHEN b.low - b.close NOT {fits} THEN b.low END
+        FROM legacy b JOIN symbols s USING (symbol)
+    """)
+    overflow = conn.execute("SELECT count(*) FROM daily_prices_compact WHERE open_full IS NOT NULL").fetchone()[0]
+    assert overflow == 2   # the BRK.A opens, which the migration has to take from *_full
+    conn.execute("""
+        CREATE VIEW daily_prices AS
+            SELECT s.symbol, p.event_date, COALESCE(p.close + p.open_delta, p.open_full) AS open,
+                   COALESCE(p.close + p.high_delta, p.high_full) AS high,
+                   COALESCE(p.close + p.low_delta, p.low_full) AS low, p.close, p.volume
+            FROM daily_prices_compact p JOIN symbols s USING (symbol_id);
+    """)
+    conn.close()
+    return path
+
+
+def table_columns(db: MarketDatabase, table: str) -> list:
+    return [row[0] for row in db._get_connection().execute(
+        "SELECT column_name FROM information_schema.columns WHERE table_name = ? ORDER BY ordinal_position",
+        (table,)).fetchall()]
+
+
+def test_legacy_table_is_migrated_behind_the_view(legacy_path):
+    db = MarketDatabase(legacy_path)
+    assert_same_rows(read_view(db))
+    assert table_columns(db, 'daily_prices_compact') == \
+        ['symbol_id', 'event_date', 'open', 'high', 'low', 'close', 'volume']
+    assert db._get_connection().execute("SELECT count(*) FROM view_market_signals").fetchone()[0] == len(LEGACY_ROWS)
+    db.close()
+
+
+def test_delta_layout_is_rewritten_with_bigint_ohlc(delta_path):
+    db = MarketDatabase(delta_path)
+    assert_same_rows(read_view(db))
+    assert 'open_delta' not in table_columns(db, 'daily_prices_compact')
+    assert 'daily_prices_delta' not in {row[0] for row in db._get_connection().execute("SHOW TABLES").fetchall()}
+    db.close()
+
+
+@pytest.mark.parametrize('path_fixture', ['legacy_path', 'delta_path'])
+def test_reopening_a_migrated_file_changes_nothing(path_fixture, request):
+    path = request.getfixturevalue(path_fixture)
+    db = MarketDatabase(path)
+    symbols = db.symbol_map()
+    stored = db._get_connection().execute(
+        "SELECT * FROM daily_prices_compact ORDER BY symbol_id, event_date").df()
+    db.close()
+
+    db = MarketDatabase(path)
+    assert db.symbol_map().equals(symbols)
+    assert db._get_connection().execute(
+        "SELECT * FROM daily_prices_compact ORDER BY symbol_id, event_date").df().equals(stored)
+    assert_same_rows(read_view(db))
+    db.close()
+
+
+def test_reingest_keeps_one_row_per_key(market_db):
+    validator = PriceValidator(market_db)
+    for closes in ([10.0, 10.1], [10.0, 10.2, 10.3], [10.0, 10.2, 10.3]):
+        validator.ingest(make_batch("THYAO", closes), source="BIST")
+
+    stored = market_db._get_connection().execute("""
+        SELECT count(*), count(DISTINCT (symbol_id, event_date)) FROM daily_prices_compact
+    """).fetchone()
+    assert stored == (3, 3)
+    assert read_view(market_db)['close'].tolist() == [scaled(10.0), scaled(10.2), scaled(10.3)]
+
+
+def test_batch_with_repeated_keys_is_rejected(market_db):
+    batch = pd.concat([make_batch("THYAO", [10.0]), make_batch("THYAO", [10.5])], ignore_index=True)
+    with pytest.raises(ValueError, match="repeated"):
+        write_prices(market_db, batch)
+    assert read_view(market_db).empty
+    assert market_db.symbol_map().empty
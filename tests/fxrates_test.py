@@ -0,0 +1,52 @@
+import math
+from datetime import date
+
+import pytest
+
+from pyfolio_core.core.enums import Currency
+from pyfolio_core.core.fxrates import FxRateCache
+
+from conftest import scaled
+
+
+@pytest.fixture
+def fx_cache(market_db):
+    market_db._get_connection().execute("""
+        INSERT INTO fx_rates VALUES
+            ('USD', 'TRY', DATE '2024-01-02', ?),
+            ('USD', 'TRY', DATE '2024-01-05', ?),
+            ('EUR', 'TRY', DATE '2024-01-02', ?)
+    """, (scaled(30.0), scaled(31.0), scaled(33.0)))
+    return FxRateCache(market_db)
+
+
+def test_as_of_lookup_uses_last_rate_on_or_before_date(fx_cache):
+    assert fx_cache.rate_at(Currency.USD, Currency.TRY, date(2024, 1, 2)) == pytest.approx(30.0)
+    assert fx_cache.rate_at(Currency.USD, Currency.TRY, date(2024, 1, 4)) == pytest.approx(30.0)
+    assert fx_cache.rate_at(Currency.USD, Currency.TRY, date(2024, 1, 5)) == pytest.approx(31.0)
+    assert fx_cache.rate_at(Currency.USD, Currency.TRY, date(2024, 3, 1)) == pytest.approx(31.0)
+
+
+def test_date_before_fx_history_is_nan(fx_cache):
+    assert math.isnan(fx_cache.rate_at("USD", "TRY", date(2023, 12, 29)))
+
+
+def test_inverse_pair(fx_cache):
+    assert fx_cache.rate_at("TRY", "USD", date(2024, 1, 5)) == pytest.approx(1 / 31.0)
+
+
+def test_cross_rate_through_pivot(fx_cache):
+    # EURUSD = EURTRY / USDTRY
+    assert fx_cache.rate_at("EUR", "USD", date(2024, 1, 3)) == pytest.approx(33.0 / 30.0)
+    assert fx_cache.rate_at("USD", "EUR", date(2024, 1, 5)) == pytest.approx(31.0 / 33.0)
+
+
+def test_convert_mixed_currencies(fx_cache):
+    out = fx_cache.convert([100.0, 10.0, 10.0], ['TRY', 'USD', 'EUR'],
+                           ['2024-01-03', '2024-01-03', '2024-01-05'], Currency.TRY)
+    assert out.tolist() == pytest.approx([100.0, 300.0, 330.0])
+
+
+def test_unknown_pair_raises(fx_cache):
+    with pytest.raises(KeyError):
+        fx_cache.rate_at("GBP", "USD", date(2024, 1, 5))
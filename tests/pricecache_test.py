@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from pyfolio_core.core.pricecache import PriceCache
+
+from conftest import make_batch, scaled, write_prices
+
+
+@pytest.fixture
+def cache(market_db, tmp_path):
+    # AAA: Jan 1-5, BBB: Jan 1-3 (missing from the last cached day)
+    write_prices(market_db, make_batch("AAA", [10, 11, 12, 13, 14]))
+    write_prices(market_db, make_batch("BBB", [20, 21, 22]))
+    price_cache = PriceCache(market_db, str(tmp_path / "price_cache"))
+    assert price_cache.build("BIST") == 8
+    return price_cache
+
+
+def closes(price_cache, symbol):
+    days, values = price_cache.get_series("BIST", symbol)
+    return days.astype(str).tolist(), (values / 1e6).tolist()
+
+
+def test_build_and_slice(cache):
+    days, values = cache.get_series("BIST", "AAA", start=np.datetime64('2024-01-02'), end=np.datetime64('2024-01-04'))
+    assert days.astype(str).tolist() == ['2024-01-02', '2024-01-03', '2024-01-04']
+    assert values.tolist() == [scaled(11), scaled(12), scaled(13)]
+    with pytest.raises(KeyError):
+        cache.get_series("BIST", "CCC")
+
+
+def test_same_day_overwrite_is_written_in_place(cache, market_db):
+    write_prices(market_db, make_batch("AAA", [14.5], start="2024-01-05"))
+    assert cache.sync("BIST") == 1
+
+    assert closes(cache, "AAA")[1] == [10, 11, 12, 13, 14.5]
+    assert closes(cache, "BBB")[1] == [20, 21, 22]
+
+
+def test_append_for_known_symbol(cache, market_db):
+    write_prices(market_db, make_batch("AAA", [15, 16], start="2024-01-06"))
+    cache.sync("BIST")
+
+    days, values = closes(cache, "AAA")
+    assert days[-3:] == ['2024-01-05', '2024-01-06', '2024-01-07']
+    assert values == [10, 11, 12, 13, 14, 15, 16]
+    assert closes(cache, "BBB")[1] == [20, 21, 22]
+
+
+def test_new_symbol_gets_its_own_block(cache, market_db):
+    write_prices(market_db, make_batch("CCC", [30, 31], start="2024-01-05"))
+    write_prices(market_db, make_batch("AAA", [15], start="2024-01-06"))
+    cache.sync("BIST")
+
+    assert sorted(cache.symbols("BIST")) == ['AAA', 'BBB', 'CCC']
+    assert closes(cache, "CCC") == (['2024-01-05', '2024-01-06'], [30, 31])
+    assert closes(cache, "AAA")[1] == [10, 11, 12, 13, 14, 15]
+
+
+def test_symbol_missing_from_last_cached_day(cache, market_db):
+    # BBB catches up on the last cached day and the day after
+    write_prices(market_db, make_batch("BBB", [24, 25], start="2024-01-05"))
+    write_prices(market_db, make_batch("AAA", [15], start="2024-01-06"))
+    cache.sync("BIST")
+
+    assert closes(cache, "BBB") == (['2024-01-01', '2024-01-02', '2024-01-03', '2024-01-05', '2024-01-06'],
+                                    [20, 21, 22, 24, 25])
+    assert closes(cache, "AAA")[1] == [10, 11, 12, 13, 14, 15]
+
+    # A second sync with nothing new only rewrites the last day
+    assert cache.sync("BIST") == 2
+    assert closes(cache, "BBB")[1] == [20, 21, 22, 24, 25]
+
+
+def test_symbol_filter_is_kept_across_syncs(market_db, tmp_path):
+    write_prices(market_db, make_batch("AAA", [10, 11]))
+    write_prices(market_db, make_batch("BBB", [20, 21]))
+    price_cache = PriceCache(market_db, str(tmp_path / "price_cache"))
+    price_cache.build("BIST", ["AAA"])
+
+    write_prices(market_db, make_batch("AAA", [12], start="2024-01-03"))
+    write_prices(market_db, make_batch("BBB", [22], start="2024-01-03"))
+    price_cache.sync("BIST")
+
+    assert price_cache.symbols("BIST") == ['AAA']
+    assert closes(price_cache, "AAA")[1] == [10, 11, 12]
@@ -0,0 +1,47 @@
+from datetime import date
+
+from pyfolio_core.core.validation import PriceValidator
+
+from conftest import make_batch
+
+
+def ingest(market_db, symbol, closes, exchange, start="2024-01-01"):
+    assert PriceValidator(market_db).ingest(make_batch(symbol, closes, start), source=exchange) == len(closes)
+
+
+def test_lagging_exchange_is_screened_on_its_own_day(market_db):
+    ingest(market_db, "AAPL", [100.0, 101.0], "NASDAQ")                 # through Jan 2
+    ingest(market_db, "THYAO", [10.0, 10.5, 11.0], "BIST")              # through Jan 3
+
+    assert market_db.refresh_screener() == 2
+    nasdaq = market_db.screen(exchange="NASDAQ")
+    assert nasdaq['symbol'].tolist() == ["AAPL"]
+    assert nasdaq['event_date'].dt.date.tolist() == [date(2024, 1, 2)]
+    assert nasdaq['change_pct'].tolist() == [1.0]
+    assert market_db.screen(exchange="BIST")['event_date'].dt.date.tolist() == [date(2024, 1, 3)]
+
+
+def test_ranks_are_partitioned_by_exchange(market_db):
+    ingest(market_db, "AAPL", [100.0, 101.0], "NASDAQ")
+    ingest(market_db, "MSFT", [100.0, 102.0], "NASDAQ")
+    ingest(market_db, "THYAO", [10.0, 10.5], "BIST")
+    ingest(market_db, "GARAN", [10.0, 10.3], "BIST")
+
+    assert market_db.refresh_screener(date(2024, 1, 2), "BIST") == 2
+    assert market_db.screen(exchange="NASDAQ").empty
+
+    market_db.refresh_screener(date(2024, 1, 2), "NASDAQ")
+    ranks = market_db.screen(date(2024, 1, 2)).set_index('symbol')['change_rank']
+    assert ranks.to_dict() == {"THYAO": 1.0, "GARAN": 0.0, "MSFT": 1.0, "AAPL": 0.0}
+
+
+def test_52w_flags_need_a_year_of_history(market_db):
+    ingest(market_db, "NEW", [10.0, 10.2, 10.4], "BIST")
+    ingest(market_db, "OLD", [10.0 + 0.01 * i for i in range(366)], "BIST", start="2023-01-03")
+
+    market_db.refresh_screener(date(2024, 1, 3), "BIST")
+    flags = market_db.screen(exchange="BIST").set_index('symbol')
+    assert flags.loc["OLD", 'is_52w_high'] == True    # noqa: E712 (numpy bool)
+    assert flags.loc["OLD", 'is_52w_low'] == False    # noqa: E712
+    assert flags['is_52w_high'].isna()["NEW"]
+    assert market_db.new_52w_highs(exchange="BIST")['symbol'].tolist() == ["OLD"]
@@ -0,0 +1,30 @@
+from pyfolio_core.core.constants import SCALING_FACTOR
+from pyfolio_core.core.validation import PriceValidator
+
+from conftest import make_batch
+
+
+def test_run_of_bad_bars_never_becomes_the_reference(market_db):
+    # Jan 6-9 are 100x too large; Jan 10 is back to normal
+    closes = [10.0, 10.1, 10.2, 10.3, 10.4, 1040.0, 1050.0, 1060.0, 1070.0, 10.9]
+    valid, rejected = PriceValidator(market_db).validate(make_batch("THYAO", closes))
+
+    assert rejected['event_date'].dt.day.tolist() == [6, 7, 8, 9]
+    assert set(rejected['reason']) == {'PRICE_JUMP'}
+    assert rejected['prev_close'].tolist() == [int(10.4 * SCALING_FACTOR)] * 4
+    assert valid['event_date'].dt.day.tolist() == [1, 2, 3, 4, 5, 10]
+
+
+def test_bad_run_is_checked_against_stored_history(market_db):
+    validator = PriceValidator(market_db)
+    assert validator.ingest(make_batch("THYAO", [10.0, 10.1, 10.2]), source="BIST") == 3
+
+    batch = make_batch("THYAO", [1030.0, 1040.0, 1050.0, 1060.0, 10.7], start="2024-01-04")
+    assert validator.ingest(batch, source="BIST") == 1
+
+    stored = market_db._get_connection().execute(
+        "SELECT max(close) FROM daily_prices WHERE symbol = 'THYAO'").fetchone()[0]
+    assert stored == int(10.7 * SCALING_FACTOR)
+    quarantined = market_db._get_connection().execute(
+        "SELECT count(*) FROM quarantine_prices WHERE reason = 'PRICE_JUMP'").fetchone()[0]
+    assert quarantined == 4
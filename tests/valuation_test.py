@@ -0,0 +1,97 @@
+import math
+from datetime import date
+
+import pytest
+
+from pyfolio_core.core.fxrates import FxRateCache
+from pyfolio_core.core.valuation import PortfolioValuation
+
+from conftest import make_batch, scaled, write_prices
+
+
+@pytest.fixture
+def valuation(market_db, pfolio_db):
+    market_db._get_connection().execute("""
+        INSERT INTO fx_rates VALUES
+            ('USD', 'TRY', DATE '2024-01-01', ?),
+            ('USD', 'TRY', DATE '2024-01-08', ?),
+            ('EUR', 'TRY', DATE '2024-01-01', ?),
+            ('EUR', 'TRY', DATE '2024-01-08', ?)
+    """, (scaled(30.0), scaled(32.0), scaled(33.0), scaled(35.0)))
+
+    # Daily closes Jan 1-10; the valuation date below is Jan 9
+    write_prices(market_db, make_batch("THYAO", [250 + i for i in range(10)]))
+    write_prices(market_db, make_batch("AAPL", [180 + i for i in range(10)]))
+    write_prices(market_db, make_batch("SAP", [140 + i for i in range(10)]))
+
+    pfolio_db.execute("""
+        INSERT INTO portfolio_assets (symbol, total_quantity, currency) VALUES
+            ('THYAO', 100, 'TRY'), ('AAPL', 10, 'USD'), ('SAP', 5, 'EUR')
+    """)
+    pfolio_db._get_connection().executemany("""
+        INSERT INTO trade_logs (symbol, operation_type, date, quantity, price, commission)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, [
+        ('THYAO', 'BUY', '2024-01-02', 100, scaled(250.0), scaled(10.0)),
+        ('AAPL', 'BUY', '2024-01-02', 10, scaled(180.0), 0),
+        ('AAPL', 'SELL', '2024-01-08', 4, scaled(190.0), 0),
+        ('AAPL', 'BUY', '2024-01-10', 100, scaled(189.0), 0),   # after the valuation date
+        ('SAP', 'BUY', '2024-01-03', 5, scaled(141.0), 0),
+    ])
+    pfolio_db._get_connection().commit()
+    return PortfolioValuation(pfolio_db, market_db, FxRateCache(market_db))
+
+
+def test_mixed_portfolio_at_historical_date(valuation):
+    holdings = valuation.holdings_at(date(2024, 1, 9)).set_index('symbol')
+
+    # Market value: close of Jan 9 at the Jan 9 (= Jan 8) rate
+    assert holdings.loc['THYAO', 'market_value'] == pytest.approx(100 * 258.0)
+    assert holdings.loc['AAPL', 'total_quantity'] == 6
+    assert holdings.loc['AAPL', 'market_value'] == pytest.approx(6 * 188.0 * 32.0)
+    assert holdings.loc['SAP', 'market_value'] == pytest.approx(5 * 148.0 * 35.0)
+
+    # Invested: every cash flow at the rate of its own trade date
+    assert holdings.loc['THYAO', 'invested'] == pytest.approx(100 * 250.0 + 10.0)
+    assert holdings.loc['AAPL', 'invested'] == pytest.approx(10 * 180.0 * 30.0 - 4 * 190.0 * 32.0)
+    assert holdings.loc['SAP', 'invested'] == pytest.approx(5 * 141.0 * 33.0)
+    assert not holdings['missing_fx'].any()
+
+
+def test_total_value_in_other_base_currency(valuation):
+    totals = valuation.total_value(date(2024, 1, 9), base_currency="USD")
+    holdings = valuation.holdings_at(date(2024, 1, 9), base_currency="USD")
+
+    assert totals['market_value'] == pytest.approx(holdings['market_value'].sum(), abs=0.01)
+    assert totals['market_value'] == pytest.approx(258.0 * 100 / 32.0 + 6 * 188.0 + 5 * 148.0 * 35.0 / 32.0, abs=0.01)
+    assert totals['unpriced'] == [] and totals['missing_fx'] == []
+
+
+def test_trade_before_fx_history_is_reported_not_guessed(valuation, pfolio_db):
+    pfolio_db.execute("""
+        INSERT INTO trade_logs (symbol, operation_type, date, quantity, price)
+        VALUES ('SAP', 'BUY', '2023-06-01', 1, ?)
+    """, (scaled(120.0),))
+    pfolio_db._get_connection().commit()
+
+    holdings = valuation.holdings_at(date(2024, 1, 9)).set_index('symbol')
+    assert holdings.loc['SAP', 'missing_fx']
+    assert math.isnan(holdings.loc['SAP', 'invested'])
+
+    totals = valuation.total_value(date(2024, 1, 9))
+    assert totals['missing_fx'] == ['SAP']
+    assert totals['market_value'] == pytest.approx(100 * 258.0 + 6 * 188.0 * 32.0, abs=0.01)
+    assert totals['invested'] == pytest.approx(25010.0 + 10 * 180.0 * 30.0 - 4 * 190.0 * 32.0, abs=0.01)
+
+
+def test_position_without_close_is_unpriced(valuation, pfolio_db):
+    pfolio_db.execute("""
+        INSERT INTO trade_logs (symbol, operation_type, date, quantity, price)
+        VALUES ('AFT', 'BUY', '2024-01-03', 10, ?)
+    """, (scaled(5.0),))
+    pfolio_db._get_connection().commit()
+
+    totals = valuation.total_value(date(2024, 1, 9))
+    assert totals['unpriced'] == ['AFT']
+    assert totals['invested'] == pytest.approx(
+        25010.0 + 10 * 180.0 * 30.0 - 4 * 190.0 * 32.0 + 5 * 141.0 * 33.0, abs=0.01)